@@ -1,9 +1,10 @@
 from __future__ import annotations
 import streamlit as st
 import pandas as pd
-from utils.ui import CCY_OPTIONS, HORIZONS, mobile_css, render_perf_table
+from utils.ui import CCY_OPTIONS, HORIZONS, METRIC_VIEWS, mobile_css, render_perf_table, freshness_cols
 from utils.data import (
-    today, INDICES, ytd_default_window, compute_table, ret_custom, REGION
+    today, INDICES, ytd_default_window, compute_table, custom_column, REGION, freshness,
+    RISK_HORIZONS, RISK_COLS
 )
 
 st.set_page_config(page_title="Performance Dashboard", page_icon="📊", layout="wide")
@@ -38,19 +39,32 @@ else:
     region_filter = c4.selectbox("Regione", ["Tutte","Americas","Europe","AsiaPac","LatAm","Global","Other"])
     sort_by = c5.selectbox("Ordina per", ["— nessuno —"] + HORIZONS + ["Custom"])
     ascending = (c6.toggle("Ordine crescente", value=False))
+metric = st.radio("Metrica", list(METRIC_VIEWS), horizontal=True,
+                  help="Volatilità annualizzata, max drawdown e Sharpe per orizzonte, dagli stessi prezzi dei rendimenti.")
 
-st.caption(f"As of: **{today.date()}**")
+st.caption(f"As of: **{today().date()}**")
 
 # --- Compute
 with st.spinner("Calcolo performance..."):
     df, conv_px = compute_table(target_ccy)
 
-# Colonna Custom
-custom_vals = []
-for name in df.index:
-    r = ret_custom(conv_px.get(name, pd.Series(dtype=float)), start_custom, end_custom)
-    custom_vals.append(None if r is None else round(r, 2))
-df["Custom"] = custom_vals
+prefix, vrange, fmt = METRIC_VIEWS[metric]
+if prefix:
+    # Vista rischio: colonne "<metrica> <orizzonte>" mostrate per orizzonte (niente 1D né Custom)
+    num_cols = RISK_HORIZONS
+    df = df[["Local CCY"]].join(df[[f"{prefix} {h}" for h in RISK_HORIZONS]].set_axis(RISK_HORIZONS, axis=1))
+else:
+    num_cols = HORIZONS + ["Custom"]
+    df = df.drop(columns=RISK_COLS)
+    # Colonna Custom
+    df["Custom"] = custom_column(conv_px, list(df.index), start_custom, end_custom)
+
+# Freschezza per riga (stale-while-revalidate) e niente righe vuote
+df = df.join(freshness_cols(freshness(list(df.index))))
+blank = df[[c for c in HORIZONS if c in df.columns]].isna().all(axis=1)
+if blank.any():
+    st.caption("Dati non disponibili per: " + ", ".join(df.index[blank]))
+    df = df[~blank]
 
 # Region + ordering per blocchi
 df.insert(0, "Region", [REGION.get(ix, "Other") for ix in df.index])
@@ -63,13 +77,13 @@ if region_filter and region_filter != "Tutte":
     df = df[df["Region"] == region_filter]
 
 # Ordinamento colonna
-if sort_by in (HORIZONS + ["Custom"]):
+if sort_by in num_cols:
     df = df.sort_values(by=sort_by, ascending=ascending, na_position="last")
 
 st.markdown(f"**Performance convertite in**: `{('Valuta locale (nessuna conversione)' if target_ccy=='LOCAL' else target_ccy)}`")
 
-# --- RENDER: desktop = Styler, mobile = dataframe scrollabile
-render_perf_table(df, HORIZONS + ["Custom"], mobile=is_mobile)
+# --- RENDER: desktop = tabella HTML in cache, mobile = dataframe scrollabile
+render_perf_table(df, num_cols, mobile=is_mobile, vrange=vrange, fmt=fmt)
 
 st.divider()
 st.page_link("app.py", label="⬅️ Torna alla Home")
@@ -1,11 +1,13 @@
 from __future__ import annotations
 import streamlit as st
+from utils.warm import start_background
 
 st.set_page_config(
     page_title="WEI-like Market Dashboard",
     page_icon="📊",
     layout="wide",
 )
+start_background()  # warm-up prezzi/tabelle in background (una volta per processo)
 
 st.title("WEI-like Market Dashboards")
 st.markdown(
@@ -0,0 +1,147 @@
+"""Benchmark offline della pipeline dati (nessuna rete).
+
+Installa come fonte dati un `MemoryProvider` su prezzi sintetici (anche con WEI_PROVIDER_DIR
+impostata) e misura tempo, picco di memoria e numero di chiamate per `compute_table`, `build_series_rebased`, `convert_series`,
+`pct_return` e `ret_custom` al crescere dell'universo e dello storico, più il costo aggiunto dalle
+metriche di rischio (`risk_table` contro `returns_table` sullo stesso pannello) e dalla correlazione.
+
+    python bench/bench_pipeline.py                       # 26/200/2000 ticker × 5Y/30Y
+    python bench/bench_pipeline.py --sizes 26 --years 5  # giro rapido
+    python bench/bench_pipeline.py --json bench.json     # risultati anche in JSON
+    python bench/bench_pipeline.py --sizes 26,500 --years 5 --no-mem   # costo delle metriche di rischio
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import utils.data as data  # noqa: E402
+from utils.engine import FilledPanel, returns_table, risk_table  # noqa: E402
+from utils.fetch import MemoryProvider, set_provider  # noqa: E402
+from utils.scheduler import FetchScheduler, set_scheduler  # noqa: E402
+from utils.snapshot import publish_snapshot  # noqa: E402
+from utils.store import set_store  # noqa: E402
+
+CCYS = ["USD", "CAD", "EUR", "GBP", "CHF", "SEK", "DKK", "JPY", "CNY", "HKD", "TWD", "KRW", "AUD", "BRL", "MXN"]
+
+def synthetic_universe(n: int, years: int, seed: int = 0):
+    """n indici (GBM con buchi da festività) + un cambio XXXUSD=X per valuta; `today` compreso."""
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(data.today() - pd.DateOffset(years=years), data.today())
+    def walk(vol: float, level: float) -> pd.Series:
+        s = pd.Series(level * np.exp(np.cumsum(rng.normal(0.0002, vol, len(idx)))), index=idx)
+        return s[rng.random(len(idx)) > 0.03]
+    indices = {f"IDX {i:04d}": (f"T{i:04d}", CCYS[i % len(CCYS)]) for i in range(n)}
+    prices = {tkr: walk(0.01, 100.0) for tkr, _ in indices.values()}
+    prices.update({f"{c}USD=X": walk(0.004, 1.0) for c in CCYS if c != "USD"})
+    return indices, prices
+
+class CountingProvider(MemoryProvider):
+    """Prezzi sintetici in memoria; conta richieste (`calls`) e ticker richiesti."""
+
+    def __init__(self, prices: dict[str, pd.Series]):
+        super().__init__(prices)
+        self.tickers = 0
+
+    def download(self, tickers, start, end, field="Adj Close"):
+        self.tickers += len(tickers)
+        return super().download(tickers, start, end, field)
+
+def _reset_caches():
+    data.PRICES.clear(); data.FX.clear(); data.RESULTS.clear()
+    publish_snapshot(None)
+
+def _stage(results: list, label: str, fn, fake: CountingProvider, mem: bool):
+    calls0 = fake.calls
+    if mem: tracemalloc.start()
+    t0 = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] / 2**20 if mem else None
+    if mem: tracemalloc.stop()
+    results.append({"stage": label, "wall_s": round(wall, 4),
+                    "peak_mb": None if peak is None else round(peak, 1),
+                    "downloads": fake.calls - calls0})
+
+def run(n: int, years: int, mem: bool = True) -> list[dict]:
+    indices, prices = synthetic_universe(n, years)
+    fake = CountingProvider(prices)
+    orig_provider, orig_indices = set_provider(fake), dict(data.INDICES)
+    data.INDICES.clear(); data.INDICES.update(indices)
+    set_store(None)
+    set_scheduler(FetchScheduler(rate=1000, burst=1000))
+    _reset_caches()
+    names = list(indices); sample = names[:10]
+    # le viste della dashboard coprono al più 5Y (più un mese): quelle righe costano uguale a 5Y e 30Y;
+    # gli stadi per serie e "storico intero" lavorano su tutto lo storico sintetico
+    start = data.today() - pd.DateOffset(years=years)
+    px_local = {nm: prices[t][prices[t].index >= start] for nm, (t, _) in indices.items()}
+    full = {}
+    conv = {}
+    res: list[dict] = []
+    try:
+        _stage(res, "compute_table USD (freddo, 5Y)", lambda: data.compute_table("USD"), fake, mem)
+        _stage(res, "compute_table EUR (nuova valuta)", lambda: data.compute_table("EUR"), fake, mem)
+        _stage(res, "compute_table USD (in cache)", lambda: data.compute_table("USD"), fake, mem)
+        _stage(res, "custom_column", lambda: data.custom_column(data.compute_table("USD")[1], names,
+                                                                 "2024-12-31", data.today()), fake, mem)
+        fp = data.compute_table("USD")[1]
+        _stage(res, f"returns_table {n} × {len(data.HORIZONS)}", lambda: returns_table(fp, data.HORIZONS), fake, mem)
+        _stage(res, f"risk_table {n} × {len(data.RISK_HORIZONS)} × 3", lambda: risk_table(fp, data.RISK_HORIZONS), fake, mem)
+        _stage(res, "build_series_rebased 10 × 1Y EUR", lambda: data.build_series_rebased(sample, "EUR", "1Y"), fake, mem)
+        _stage(res, "correlation 10 × 1Y EUR", lambda: data.correlation(sample, "EUR", "1Y"), fake, mem)
+        _stage(res, "build_series_rebased 10 × 5Y EUR", lambda: data.build_series_rebased(sample, "EUR", "5Y"), fake, mem)
+        _stage(res, f"pannello EUR {years}Y (fetch + FX)", lambda: full.update(
+            fp=FilledPanel(data.converted_panel("EUR", start))), fake, mem)
+        _stage(res, f"returns_table {n} × {years}Y", lambda: returns_table(full["fp"], ["ALL"], {"ALL": start}), fake, mem)
+        _stage(res, f"risk_table {n} × {years}Y", lambda: risk_table(full["fp"], ["ALL"], {"ALL": start}), fake, mem)
+        def rebased_full():
+            p = data.converted_panel("EUR", start, names=tuple(sample))
+            return p / p.bfill().iloc[0] * 100.0
+        _stage(res, f"rebased 10 × {years}Y EUR", rebased_full, fake, mem)
+        fx_map = data.build_fx_map(CCYS, start)
+        _stage(res, f"convert_series × {n}", lambda: conv.update(
+            {nm: data.convert_series(px_local[nm], indices[nm][1], "EUR", fx_map) for nm in names}), fake, mem)
+        _stage(res, f"pct_return × {n}×{len(data.HORIZONS)}", lambda: [
+            data.pct_return(conv[nm], h) for nm in names for h in data.HORIZONS], fake, mem)
+        _stage(res, f"ret_custom × {n}", lambda: [
+            data.ret_custom(conv[nm], "2024-12-31", data.today()) for nm in names], fake, mem)
+    finally:
+        set_provider(orig_provider)
+        data.INDICES.clear(); data.INDICES.update(orig_indices)
+        _reset_caches()
+    for r in res: r.update({"tickers": n, "years": years})
+    return res
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="26,200,2000", help="numero di ticker, separati da virgola")
+    ap.add_argument("--years", default="5,30", help="anni di storico, separati da virgola")
+    ap.add_argument("--no-mem", action="store_true", help="salta il secondo giro con tracemalloc (picco memoria)")
+    ap.add_argument("--json", help="salva i risultati in questo file")
+    args = ap.parse_args(argv)
+    rows = []
+    for years in map(int, args.years.split(",")):
+        for n in map(int, args.sizes.split(",")):
+            # tempi da un giro pulito; il picco di memoria da un secondo giro con tracemalloc,
+            # che altrimenti gonfierebbe i tempi di 5-7x
+            out = run(n, years, mem=False)
+            if not args.no_mem:
+                peaks = {r["stage"]: r["peak_mb"] for r in run(n, years, mem=True)}
+                for r in out: r["peak_mb"] = peaks.get(r["stage"])
+            rows += out
+            print(f"\n== {n} ticker, {years}Y di storico ==")
+            print(pd.DataFrame(out).drop(columns=["tickers", "years"]).set_index("stage").to_string())
+    if args.json: Path(args.json).write_text(json.dumps(rows, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
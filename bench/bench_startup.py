@@ -0,0 +1,116 @@
+"""Controllo dei tempi di avvio (nessuna rete).
+
+Misura, ciascuno in un processo Python nuovo, il costo degli import di ogni pagina oltre a
+`streamlit` (che il server ha già caricato) e verifica che le dipendenze pesanti non vengano
+caricate dove non servono. Poi esegue le pagine con `AppTest` su prezzi sintetici e misura
+primo run e rerun. Esce con codice 1 se un tempo supera il budget.
+
+    python bench/bench_startup.py
+    python bench/bench_startup.py --rerun-budget 0.3 --json startup.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# import di ogni entry point (oltre a streamlit) e moduli che NON devono comparire
+ENTRY_IMPORTS = {
+    "app.py": ("import utils.warm", ["pandas", "numpy", "yfinance", "plotly.express", "matplotlib"]),
+    "Performance": ("import utils.ui, utils.data, utils.warm, utils.metrics, utils.universe",
+                    ["yfinance", "plotly.express", "matplotlib"]),
+    "Comparison": ("import utils.ui, utils.data, utils.decimate, utils.warm, utils.charts",
+                   ["yfinance", "plotly.express", "matplotlib"]),
+}
+PAGES = {"app.py": "app.py", "Performance": "pages/1_📊_Performance_Dashboard.py",
+         "Comparison": "pages/2_📈_Comparison_Dashboard.py"}
+
+_PROBE = """
+import sys, time, json
+import streamlit
+t = time.perf_counter()
+{stmt}
+dt = time.perf_counter() - t
+print(json.dumps({{"s": dt, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+def import_cost(stmt: str, forbidden: list[str], repeat: int = 3) -> tuple[float, list[str]]:
+    """Miglior tempo su `repeat` processi freschi (la cache del filesystem è calda dopo il primo)."""
+    best, loaded = float("inf"), []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(stmt=stmt, forbidden=forbidden)],
+                             cwd=ROOT, capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        best, loaded = min(best, r["s"]), r["loaded"]
+    return best, loaded
+
+def offline_prices(years: int = 6, seed: int = 0) -> dict:
+    """Prezzi sintetici per i ticker dell'universo e i cambi XXXUSD=X."""
+    import numpy as np
+    import pandas as pd
+    from utils.data import INDICES, today
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(today() - pd.DateOffset(years=years), today())
+    walk = lambda vol: pd.Series(100 * np.exp(np.cumsum(rng.normal(0.0002, vol, len(idx)))), index=idx)
+    prices = {t: walk(0.01) for t, _ in INDICES.values()}
+    prices.update({f"{c}USD=X": walk(0.004) / 100 for c in {c for _, c in INDICES.values()} if c != "USD"})
+    return prices
+
+def page_runs(reruns: int = 5) -> dict[str, tuple[float, float]]:
+    """(primo run, miglior rerun) in secondi per pagina, con fetcher offline e senza warm-up."""
+    os.environ["WEI_WARM"] = "0"
+    from streamlit.testing.v1 import AppTest
+    from utils.fetch import MemoryProvider, set_provider
+    from utils.store import set_store
+    set_store(None); set_provider(MemoryProvider(offline_prices()))
+    out = {}
+    for label, page in PAGES.items():
+        at = AppTest.from_file(str(ROOT / page), default_timeout=120)
+        t = time.perf_counter(); at.run(); first = time.perf_counter() - t
+        errs = [e.value for e in at.exception if "Could not find page" not in e.value]
+        if errs: raise RuntimeError(f"{page}: {errs[0]}")
+        best = float("inf")
+        for _ in range(reruns):
+            t = time.perf_counter(); at.run(); best = min(best, time.perf_counter() - t)
+        out[label] = (first, best)
+    return out
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--home-budget", type=float, default=0.05, help="s: import della home oltre a streamlit")
+    ap.add_argument("--import-budget", type=float, default=0.8, help="s: import di una pagina oltre a streamlit")
+    ap.add_argument("--first-budget", type=float, default=3.0, help="s: primo run di una pagina (cache fredde)")
+    ap.add_argument("--rerun-budget", type=float, default=0.25, help="s: rerun di una pagina (cache calde)")
+    ap.add_argument("--json", help="salva i risultati in questo file")
+    args = ap.parse_args(argv)
+    sys.path.insert(0, str(ROOT)); os.chdir(ROOT)
+    import logging, warnings
+    logging.disable(logging.CRITICAL); warnings.filterwarnings("ignore")   # page_link fuori dal server
+
+    rows, fails = [], []
+    def check(what: str, value: float, budget: float, note: str = ""):
+        ok = value <= budget and not note
+        rows.append({"misura": what, "s": round(value, 3), "budget": budget, "ok": ok, "note": note})
+        if not ok: fails.append(what)
+    for label, (stmt, forbidden) in ENTRY_IMPORTS.items():
+        dt, loaded = import_cost(stmt, forbidden)
+        check(f"import {label}", dt, args.home_budget if label == "app.py" else args.import_budget,
+              f"carica {', '.join(loaded)}" if loaded else "")
+    for label, (first, rerun) in page_runs().items():
+        check(f"primo run {label}", first, args.first_budget)
+        check(f"rerun {label}", rerun, args.rerun_budget)
+
+    w = max(len(r["misura"]) for r in rows)
+    for r in rows:
+        print(f"{r['misura']:<{w}}  {r['s']:7.3f}s  (budget {r['budget']:.2f}s)  "
+              f"{'ok' if r['ok'] else 'FUORI BUDGET'} {r['note']}")
+    if args.json: Path(args.json).write_text(json.dumps(rows, indent=2))
+    return 1 if fails else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
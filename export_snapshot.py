@@ -0,0 +1,11 @@
+"""Export batch da riga di comando: `python export_snapshot.py --out snapshot --format parquet,csv`.
+
+Calcola tabelle rendimenti, pannelli prezzi e serie rebased per tutte le valute e gli orizzonti in un
+solo processo, senza importare Streamlit. La dashboard rilegge l'export con `WEI_SNAPSHOT_DIR=snapshot`.
+"""
+import sys
+
+from utils.export import main
+
+if __name__ == "__main__":
+    sys.exit(main())
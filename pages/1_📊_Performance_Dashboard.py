@@ -3,12 +3,18 @@ import streamlit as st
 import pandas as pd
 
 # ⚠️ Import CORRETTI: REGION arriva da utils.data (non da utils.ui)
-from utils.ui import CCY_OPTIONS, HORIZONS, style_perf_df
+from utils.ui import CCY_OPTIONS, HORIZONS, METRIC_VIEWS, perf_table_html, freshness_cols
+from utils.warm import start_background
+from utils.metrics import METRICS
+from utils.universe import select, regions, all_tags
 from utils.data import (
-    today, INDICES, ytd_default_window, compute_table, ret_custom, REGION
+    today, UNIVERSE, ytd_default_window, compute_table, custom_column, REGION, freshness, fetch_report, current_snapshot,
+    live_1d, RISK_HORIZONS, RISK_COLS
 )
+from utils.quotes import QUOTE_INTERVAL, get_quote_poller
 
 st.set_page_config(page_title="Performance Dashboard", page_icon="📊", layout="wide")
+start_background()
 
 st.header("Performance Dashboard")
 st.write("Tabella dei rendimenti per indice, con valuta selezionabile e finestra **Custom**.")
@@ -22,52 +28,98 @@ s_def, e_def = ytd_default_window()
 start_custom = c2.date_input("Custom start", value=s_def.date(), format="YYYY-MM-DD")
 end_custom   = c3.date_input("Custom end", value=e_def.date(), format="YYYY-MM-DD")
 
-region_filter = c4.selectbox("Regione", ["Tutte","Americas","Europe","AsiaPac","LatAm","Global","Other"])
+# Ordine blocchi per regione (serve per i separatori); regioni extra dal file universo in coda
+order = {"Americas":0, "Europe":1, "AsiaPac":2, "LatAm":3, "Global":4, "Other":9}
+region_opts = sorted(set(order) | set(regions(UNIVERSE)), key=lambda r: (order.get(r, 5), r))
+region_filter = c4.selectbox("Regione", ["Tutte"] + region_opts)
 sort_by = c5.selectbox("Ordina per", ["— nessuno —"] + HORIZONS + ["Custom"])
 ascending = (c6.toggle("Ordine crescente", value=False))
 
-st.caption(f"As of: **{today.date()}**")
+tags = all_tags(UNIVERSE)
+t1, t2 = st.columns([2, 1.5])
+tag_filter = t1.multiselect("Tag", tags) if tags else []
+metric = t2.radio("Metrica", list(METRIC_VIEWS), horizontal=True,
+                  help="Volatilità annualizzata, max drawdown e Sharpe per orizzonte, dagli stessi prezzi dei rendimenti.")
+
+st.caption(f"As of: **{today().date()}**")
+live = st.toggle("Live intraday", value=False,
+                 help=f"Aggiorna solo la colonna 1D con le ultime quotazioni ogni {QUOTE_INTERVAL:.0f}s (storico invariato).")
+
+# --- Selezione: si scaricano e calcolano solo le righe che passano i filtri,
+# a pagine di PAGE_ROWS per universi grandi (le successive su richiesta)
+PAGE_ROWS = 100
+names = select(UNIVERSE, region_filter, tag_filter)
+if not names:
+    st.info("Nessun indice corrisponde ai filtri Regione/Tag.")
+    st.stop()
+page_key = f"rows:{region_filter}:{','.join(tag_filter)}"
+shown_n = st.session_state.get(page_key, PAGE_ROWS)
 
 # --- Compute
 with st.spinner("Calcolo performance..."):
-    df, conv_px = compute_table(target_ccy)
-
-# Colonna Custom (usa i date-picker visibili)
-custom_vals = []
-for name in df.index:
-    r = ret_custom(conv_px.get(name, pd.Series(dtype=float)), start_custom, end_custom)
-    custom_vals.append(None if r is None else round(r, 2))
-df["Custom"] = custom_vals
+    df, conv_px = compute_table(target_ccy, names[:shown_n])
+
+prefix, vrange, fmt = METRIC_VIEWS[metric]
+if prefix:
+    # Vista rischio: colonne "<metrica> <orizzonte>" mostrate per orizzonte (niente 1D né Custom)
+    num_cols = RISK_HORIZONS
+    df = df[["Local CCY"]].join(df[[f"{prefix} {h}" for h in RISK_HORIZONS]].set_axis(RISK_HORIZONS, axis=1))
+else:
+    num_cols = HORIZONS + ["Custom"]
+    df = df.drop(columns=RISK_COLS)
+    # Colonna Custom (usa i date-picker visibili)
+    df["Custom"] = custom_column(conv_px, list(df.index), start_custom, end_custom)
+
+# Freschezza per riga (stale-while-revalidate) e niente righe vuote
+df = df.join(freshness_cols(freshness(list(df.index))))
+blank = df[[c for c in HORIZONS if c in df.columns]].isna().all(axis=1)
+if blank.any():
+    st.caption("Dati non disponibili per: " + ", ".join(df.index[blank]))
+    df = df[~blank]
 
 # Aggiungi Region
 df.insert(0, "Region", [REGION.get(ix, "Other") for ix in df.index])
 
-# Ordine blocchi per regione (serve per i separatori)
-order = {"Americas":0, "Europe":1, "AsiaPac":2, "LatAm":3, "Global":4, "Other":9}
-df["_ord"] = df["Region"].map(order).fillna(9)
-df = df.sort_values(by=["_ord", "Index"]).drop(columns="_ord")
-
-# Filtro regione
-if region_filter and region_filter != "Tutte":
-    df = df[df["Region"] == region_filter]
-
-# Ordinamento per metrica, opzionale
-if sort_by in (HORIZONS + ["Custom"]):
-    df = df.sort_values(by=sort_by, ascending=ascending, na_position="last")
+df["_ord"] = df["Region"].map(order).fillna(5)
+df = df.sort_values(by=["_ord", "Region", "Index"]).drop(columns="_ord")
 
 st.markdown(f"**Performance convertite in**: `{('Valuta locale (nessuna conversione)' if target_ccy=='LOCAL' else target_ccy)}`")
 
-# --- Rendering tabella con fallback sicuro
-try:
-    styled = style_perf_df(df, HORIZONS + ["Custom"])
-    st.write(styled)
-except Exception as e:
-    st.warning(f"Rendering avanzato non disponibile: uso visualizzazione semplice. Dettagli: {e}")
-    df_show = df.copy()
-    for c in HORIZONS + ["Custom"]:
-        if c in df_show.columns:
-            df_show[c] = df_show[c].map(lambda x: f"{x:+.2f}%" if pd.notna(x) else "")
-    st.dataframe(df_show, use_container_width=True)
+# --- Tabella in un fragment: in modalità live si riesegue da solo ogni QUOTE_INTERVAL secondi
+# e ricalcola soltanto la colonna 1D dalle quotazioni (tabella e storico restano in cache)
+@st.fragment(run_every=QUOTE_INTERVAL if live else None)
+def show_table(df: pd.DataFrame):
+    if live and "1D" in df.columns:
+        df = df.copy(deep=False)
+        df["1D"] = live_1d(list(df.index), target_ccy, conv_px).round(2).fillna(df["1D"])
+        poller = get_quote_poller()
+        st.caption(f"Quotazioni live delle {poller.polled:%H:%M:%S}" if poller.polled is not None
+                   else "Quotazioni live: in attesa del primo aggiornamento")
+        if poller.last_error: st.caption(f"Ultimo aggiornamento quotazioni fallito: {poller.last_error}")
+
+    # Ordinamento per metrica, opzionale
+    if sort_by in num_cols:
+        df = df.sort_values(by=sort_by, ascending=ascending, na_position="last")
+
+    # --- Rendering tabella (HTML precalcolato e in cache) con fallback sicuro
+    try:
+        view_key = (target_ccy, region_filter, sort_by, ascending, metric)
+        st.markdown(perf_table_html(df, tuple(num_cols), view_key, vrange, fmt), unsafe_allow_html=True)
+    except Exception as e:
+        st.warning(f"Rendering avanzato non disponibile: uso visualizzazione semplice. Dettagli: {e}")
+        df_show = df.copy()
+        for c in num_cols:
+            if c in df_show.columns:
+                df_show[c] = df_show[c].map(lambda x: fmt % x if pd.notna(x) else "")
+        st.dataframe(df_show, use_container_width=True)
+
+show_table(df)
+
+if len(names) > shown_n:
+    st.caption(f"Mostrate {shown_n} di {len(names)} righe (ordinamento sulle righe caricate).")
+    if st.button(f"Carica altre {min(PAGE_ROWS, len(names) - shown_n)} righe"):
+        st.session_state[page_key] = shown_n + PAGE_ROWS
+        st.rerun()
 
 st.divider()
 st.page_link("app.py", label="⬅️ Torna alla Home")
@@ -75,15 +127,30 @@ st.page_link("app.py", label="⬅️ Torna alla Home")
 # (Facoltativa) mini-diagnostica versioni in sidebar
 with st.sidebar:
     st.subheader("Diagnostica")
-    import sys, pandas as _pd, plotly as _pl
-    try:
-        import matplotlib
-        mpl_ver = matplotlib.__version__
-    except Exception:
-        mpl_ver = "non installato"
+    import sys
+    from importlib.metadata import version, PackageNotFoundError
+    def _ver(pkg: str) -> str:   # versione dai metadati: niente import di plotly/matplotlib a ogni rerun
+        try: return version(pkg)
+        except PackageNotFoundError: return "non installato"
     st.write({
         "Python": sys.version.split()[0],
-        "pandas": _pd.__version__,
-        "plotly": _pl.__version__,
-        "matplotlib": mpl_ver,
-    })
\ No newline at end of file
+        "pandas": pd.__version__,
+        "plotly": _ver("plotly"),
+        "matplotlib": _ver("matplotlib"),
+    })
+    snap = current_snapshot()
+    st.caption(f"Snapshot warm-up: {snap.version} del {snap.built:%Y-%m-%d %H:%M}" if snap
+               else "Snapshot warm-up: in preparazione")
+    rep = fetch_report()
+    if not rep.empty:
+        with st.expander("Download: latenza ed errori per ticker"):
+            st.dataframe(rep, use_container_width=True)
+    with st.expander("Tempi per fase e cache"):
+        tim, cache, nbytes = METRICS.timings_frame(), METRICS.cache_frame(), METRICS.bytes_frame()
+        if not tim.empty: st.dataframe(tim, use_container_width=True)
+        if not cache.empty: st.dataframe(cache, use_container_width=True)
+        if not nbytes.empty:
+            st.caption(f"Scaricati {nbytes['Byte'].sum() / 2**10:,.0f} KiB (payload decodificato), per ticker:")
+            st.dataframe(nbytes, use_container_width=True)
+        st.download_button("Esporta metriche (Prometheus)", METRICS.prometheus(),
+                           file_name="wei_metrics.prom", mime="text/plain")
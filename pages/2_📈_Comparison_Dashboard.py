@@ -1,14 +1,17 @@
 from __future__ import annotations
 import streamlit as st
-import plotly.express as px
-import numpy as np
 import pandas as pd
 from utils.ui import CCY_OPTIONS, HORIZONS
+from utils.decimate import point_budget
+from utils.warm import start_background
 from utils.data import (
-    INDICES, build_series_rebased, today
+    INDICES, build_series_rebased, patch_rebased_live, correlation
 )
+from utils.quotes import QUOTE_INTERVAL
+from utils.charts import rebased_figure, rebased_payload, sized, corr_heatmap
 
 st.set_page_config(page_title="Comparison Dashboard", page_icon="📈", layout="wide")
+start_background()
 
 st.header("Comparison Dashboard")
 st.write("Confronta indici con **rebased=100** su finestra selezionabile e valuta target.")
@@ -26,45 +29,48 @@ with right:
     horizon = st.selectbox("Orizzonte", HORIZONS, index=4)  # default 1Y
     scrollzoom = st.toggle("Zoom con rotella", value=False)
     fullscreen = st.toggle("Schermo intero", value=False)
+    fast_render = st.toggle("Render veloce", value=False,
+                            help="Riduce i punti per traccia (LTTB) mantenendo picchi e minimi: utile su 3Y/5Y e da smartphone.")
+    live = st.toggle("Live intraday", value=False,
+                     help=f"Aggiorna solo l'ultimo punto con le ultime quotazioni ogni {QUOTE_INTERVAL:.0f}s.")
+
+# Grafico in un fragment: in modalità live si riesegue da solo e sposta solo l'ultimo punto.
+# Fuori dal live le tracce arrivano dal payload in cache: i toggle di vista cambiano solo layout e config.
+@st.fragment(run_every=QUOTE_INTERVAL if live else None)
+def show_chart(payload: dict, df: pd.DataFrame):
+    if live: payload = rebased_payload(patch_rebased_live(df, target_ccy), target_ccy, horizon)
+    config = {
+        "displaylogo": False,
+        "scrollZoom": bool(scrollzoom),
+        "modeBarButtonsToRemove": ["toggleSpikelines"],
+        "responsive": True
+    }
+    st.plotly_chart(sized(payload, width, height, fullscreen), use_container_width=True, config=config)
 
 if not indices:
     st.info("Seleziona almeno un indice.")
 else:
+    width, height = (1100, 600) if not fullscreen else (1400, 800)
+    max_points = point_budget(horizon, width) if fast_render else None
     with st.spinner("Creo il grafico..."):
-        df = build_series_rebased(indices, target_ccy, horizon)
+        df = build_series_rebased(indices, target_ccy, horizon, max_points=max_points)
+        payload = rebased_figure(indices, target_ccy, horizon, max_points)
 
-    if df is None or df.empty:
+    if payload is None:
         st.warning("Nessun dato disponibile per la combinazione scelta.")
     else:
-        width, height = (1100, 600) if not fullscreen else (1400, 800)
-        fig = px.line(
-            df, x=df.index, y=df.columns,
-            labels={"value": f"Indice (base=100) in {target_ccy}", "x": "Data"},
-            title=f"Rebased {horizon} — Valuta {target_ccy}"
-        )
-        fig.update_layout(
-            width=width, height=height, autosize=False,
-            font=dict(size=14 if not fullscreen else 16),
-            legend_title_text="Indice",
-            legend=dict(font=dict(size=12 if not fullscreen else 14)),
-            hovermode="x unified",
-            margin=dict(l=40, r=30, t=60, b=40),
-            plot_bgcolor="white", paper_bgcolor="white",
-        )
-        fig.update_xaxes(
-            rangebreaks=[dict(bounds=["sat", "mon"])],
-            showgrid=True, gridcolor="LightGray", title_font=dict(size=14)
-        )
-        fig.update_yaxes(showgrid=True, gridcolor="LightGray", title_font=dict(size=14))
-        fig.update_traces(connectgaps=True)
-
-        config = {
-            "displaylogo": False,
-            "scrollZoom": bool(scrollzoom),
-            "modeBarButtonsToRemove": ["toggleSpikelines"],
-            "responsive": True
-        }
-        st.plotly_chart(fig, use_container_width=True, config=config)
+        corr = correlation(indices, target_ccy, horizon)
+        if corr is None:
+            show_chart(payload, df)
+        else:
+            chart_col, corr_col = st.columns([3, 1.3])
+            with chart_col: show_chart(payload, df)
+            with corr_col:
+                if corr.isna().all().all():
+                    st.caption("Correlazione: finestra troppo corta (servono almeno 20 rendimenti giornalieri).")
+                else:
+                    st.plotly_chart(corr_heatmap(corr, horizon, height, fullscreen), use_container_width=True,
+                                    config={"displaylogo": False})
 
 st.divider()
 st.page_link("app.py", label="⬅️ Torna alla Home")
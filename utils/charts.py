@@ -0,0 +1,65 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+from utils.data import RESULTS, build_series_rebased, selection_version, today
+from utils.metrics import timer
+
+# Payload dei grafici come dict Plotly (niente plotly.express): le tracce tengono array NumPy,
+# che Plotly serializza in typed array base64 ({"dtype": "f4", "bdata": ...}) invece di liste JSON.
+# Date in ms dall'epoch (float64, asse "date"), valori in float32: ~7 cifre, oltre il disegnabile.
+
+def _epoch_ms(index: pd.Index) -> np.ndarray:
+    return index.values.astype("datetime64[ms]").astype(np.int64).astype(np.float64)
+
+def rebased_payload(df: pd.DataFrame, target_ccy: str, horizon: str) -> dict:
+    """Tracce (una per indice, solo punti validi) e layout di base del grafico rebased=100."""
+    x = _epoch_ms(df.index); data = []
+    with timer("chart.payload"):
+        for c in df.columns:
+            y = df[c].to_numpy(dtype=float); ok = ~np.isnan(y)
+            data.append({"type": "scatter", "mode": "lines", "name": str(c), "x": x[ok],
+                         "y": y[ok].astype(np.float32), "connectgaps": True,
+                         "hovertemplate": "%{y:.2f}"})
+    layout = {
+        "title": {"text": f"Rebased {horizon} — Valuta {target_ccy}"},
+        "legend": {"title": {"text": "Indice"}},
+        "hovermode": "x unified",
+        "margin": dict(l=40, r=30, t=60, b=40),
+        "plot_bgcolor": "white", "paper_bgcolor": "white",
+        "xaxis": {"type": "date", "title": {"text": "Data", "font": {"size": 14}},
+                  "rangebreaks": [dict(bounds=["sat", "mon"])], "showgrid": True, "gridcolor": "LightGray"},
+        "yaxis": {"title": {"text": f"Indice (base=100) in {target_ccy}", "font": {"size": 14}},
+                  "showgrid": True, "gridcolor": "LightGray"},
+    }
+    return {"data": data, "layout": layout}
+
+def rebased_figure(name_list: list[str], target_ccy: str, horizon: str,
+                   max_points: int | None = None) -> dict | None:
+    """
+    Payload del grafico rebased in cache per (indici, valuta, orizzonte, punti) e versione dati,
+    condiviso tra sessioni e in sola lettura: i toggle di sola vista lo riusano con `sized`.
+    """
+    names = tuple(name_list)
+    def build():
+        df = build_series_rebased(list(names), target_ccy, horizon, max_points=max_points)
+        return None if df is None or df.empty else rebased_payload(df, target_ccy, horizon)
+    return RESULTS.get(("figure", target_ccy, horizon, today(), names, max_points or 0),
+                       selection_version(names, target_ccy), build)
+
+def sized(payload: dict, width: int, height: int, fullscreen: bool = False) -> dict:
+    """Figura pronta per `st.plotly_chart`: stesse tracce (nessuna copia), layout con dimensioni e font."""
+    layout = dict(payload["layout"], width=width, height=height, autosize=False,
+                  font=dict(size=14 if not fullscreen else 16))
+    layout["legend"] = dict(layout["legend"], font=dict(size=12 if not fullscreen else 14))
+    return {"data": payload["data"], "layout": layout}
+
+def corr_heatmap(corr: pd.DataFrame, horizon: str, height: int, fullscreen: bool = False) -> dict:
+    """Heatmap della matrice di correlazione (valori come typed array, etichette nelle celle)."""
+    names = [str(c) for c in corr.columns]
+    return {"data": [{"type": "heatmap", "z": corr.to_numpy(dtype=float).astype(np.float32), "x": names, "y": names,
+                      "zmin": -1, "zmax": 1, "colorscale": "RdBu", "showscale": False,
+                      "texttemplate": "%{z:.2f}", "hovertemplate": "%{y} / %{x}: %{z:.2f}<extra></extra>"}],
+            "layout": {"title": {"text": f"Correlazione rendimenti giornalieri {horizon}"}, "height": height,
+                       "margin": dict(l=10, r=10, t=60, b=10), "yaxis": {"autorange": "reversed"},
+                       "font": dict(size=12 if not fullscreen else 14)}}
@@ -1,57 +1,39 @@
 from __future__ import annotations
+import hashlib
+import os
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from functools import lru_cache
-from pandas.tseries.offsets import BDay
-import streamlit as st
-
-today = pd.Timestamp.today().normalize()
+from utils.fetch import get_provider
+from utils.store import get_store
+from utils.scheduler import get_scheduler
+from utils.engine import (FilledPanel, price_matrix, returns_table, custom_returns, risk_table, corr_matrix,
+                          daily_returns, RISK_KEYS)
+from utils.fx import master_calendar, usd_matrix, convert_panel
+from utils.snapshot import Snapshot, current_snapshot
+from utils.swr import SWRCache, FetchFailed
+from utils.decimate import decimate_frame
+from utils.metrics import timer, add_bytes
+from utils.universe import Instrument, read_universe
+from utils.results import ResultCache
+from utils.trading_calendar import today, horizon_start, ytd_window
 
 HORIZONS = ["1D", "1W", "MTD", "YTD", "1Y", "3Y", "5Y"]
 HARD = ["USD", "EUR", "GBP", "JPY", "CHF"]
 CCY_OPTIONS = ["LOCAL"] + HARD
+RISK_HORIZONS = HORIZONS[1:]          # volatilità, drawdown e Sharpe: niente 1D (un solo rendimento)
+RISK_COLS = [f"{m} {h}" for m in RISK_KEYS for h in RISK_HORIZONS]
 
-INDICES: dict[str, tuple[str, str]] = {
-    "S&P 500": ("^GSPC","USD"), "Dow Jones": ("^DJI","USD"),
-    "Nasdaq 100": ("^NDX","USD"), "Russell 2000": ("^RUT","USD"),
-    "S&P/TSX Composite (Canada)": ("^GSPTSE","CAD"),
-    "STOXX Europe 600": ("^STOXX","EUR"), "Euro Stoxx 50": ("^STOXX50E","EUR"),
-    "DAX (Germany)": ("^GDAXI","EUR"), "CAC 40 (France)": ("^FCHI","EUR"),
-    "FTSE 100 (UK)": ("^FTSE","GBP"), "FTSE MIB (Italy)": ("FTSEMIB.MI","EUR"),
-    "IBEX 35 (Spain)": ("^IBEX","EUR"), "AEX (Netherlands)": ("^AEX","EUR"),
-    "SMI (Switzerland)": ("^SSMI","CHF"),
-    "OMX Stockholm 30": ("^OMX","SEK"), "OMX Copenhagen 25": ("^OMXC25","DKK"),
-    "Nikkei 225 (Japan)": ("^N225","JPY"), "Shenzhen (China)": ("399001.SZ","CNY"),
-    "Hang Seng (Hong Kong)": ("^HSI","HKD"), "TAIEX (Taiwan)": ("^TWII","TWD"),
-    "KOSPI (Korea)": ("^KS11","KRW"), "S&P/ASX 200 (Australia)": ("^AXJO","AUD"),
-    "Ibovespa (Brazil)": ("^BVSP","BRL"), "IPC Mexico": ("^MXX","MXN"),
-    "MSCI World (USD)": ("URTH", "USD"),
-    "MSCI Emerging Markets (USD)": ("EEM", "USD"),
-}
-
-REGION = {
-    **{k:"Americas" for k in ["S&P 500","Dow Jones","Nasdaq 100","Russell 2000","S&P/TSX Composite (Canada)"]},
-    **{k:"Europe"   for k in ["STOXX Europe 600","Euro Stoxx 50","DAX (Germany)","CAC 40 (France)","FTSE 100 (UK)",
-                              "FTSE MIB (Italy)","IBEX 35 (Spain)","AEX (Netherlands)","SMI (Switzerland)"]},
-    **{k:"AsiaPac"  for k in ["Nikkei 225 (Japan)","Shenzhen (China)","Hang Seng (Hong Kong)","TAIEX (Taiwan)",
-                              "KOSPI (Korea)","S&P/ASX 200 (Australia)"]},
-    **{k:"LatAm"    for k in ["Ibovespa (Brazil)","IPC Mexico"]},
-    **{k:"Global"   for k in ["MSCI World (USD)","MSCI Emerging Markets (USD)"]},
-}
+# Universo da file (universe.csv o WEI_UNIVERSE): nome -> (ticker, valuta) e nome -> regione
+UNIVERSE: dict[str, Instrument] = read_universe()
+INDICES: dict[str, tuple[str, str]] = {n: (i.ticker, i.ccy) for n, i in UNIVERSE.items()}
+REGION: dict[str, str] = {n: i.region for n, i in UNIVERSE.items()}
 
 def period_start(h: str) -> pd.Timestamp | None:
-    if h == "1D": return None
-    if h == "1W": return today - pd.DateOffset(weeks=1)
-    if h == "MTD": return pd.Timestamp(today.year, today.month, 1)
-    if h == "YTD": return pd.Timestamp(today.year, 1, 1)
-    if h == "1Y": return today - pd.DateOffset(years=1)
-    if h == "3Y": return today - pd.DateOffset(years=3)
-    if h == "5Y": return today - pd.DateOffset(years=5)
-    return today - pd.DateOffset(years=1)
+    return horizon_start(h)
 
 def ytd_default_window() -> tuple[pd.Timestamp, pd.Timestamp]:
-    return (pd.Timestamp(today.year, 1, 1) - BDay(1)).normalize(), today
+    return ytd_window()
 
 def _ensure_series1d(x: pd.Series | pd.DataFrame) -> pd.Series:
     if isinstance(x, pd.DataFrame):
@@ -61,33 +43,153 @@ def _ensure_series1d(x: pd.Series | pd.DataFrame) -> pd.Series:
     s.index = pd.to_datetime(s.index).tz_localize(None)
     return pd.to_numeric(s, errors="coerce").astype(float)
 
-@st.cache_data(show_spinner=False, ttl=60*60)
+_EMPTY = pd.Series(dtype=float)
+
+FX_FIELD = "fx"      # campo "cambio": le chiavi sono XXXUSD=X (USD per unità), il provider sceglie il cross
+
+def _fx_key(ccy: str) -> str:
+    return f"{ccy}USD=X"
+
+def _download(tickers: list[str], start: pd.Timestamp, field: str,
+              since: dict[str, pd.Timestamp] | None = None) -> tuple[dict[str, pd.Series], set[str]]:
+    """
+    Batch di `batch_size` ticker lanciati al più `concurrency` alla volta, come dichiarato dal
+    provider; con `since` solo le barre nuove di ciascun ticker. Restituisce le serie e i ticker il
+    cui download è fallito anche dopo i retry (distinti da quelli senza dati).
+    """
+    p, sched = get_provider(), get_scheduler(); end = today() + pd.Timedelta(days=1)
+    if field == FX_FIELD:
+        def call(ch):
+            got = p.fx([t[:-5] for t in ch], min(since[t] for t in ch) if since else start, end)
+            return {_fx_key(c): s for c, s in got.items()}
+    elif since:
+        call = lambda ch: p.download_since({t: since[t] for t in ch}, end, field)
+    else:
+        call = lambda ch: p.download(ch, start, end, field)
+    bs = max(1, p.batch_size)
+    chunks = [tickers[i:i+bs] for i in range(0, len(tickers), bs)]
+    job = lambda ch: (ch, lambda: call(ch))
+    with timer("fetch"):
+        res = sched.map([job(ch) for ch in chunks], p.concurrency)
+    # Batch fallito dopo i retry: si riprova ticker per ticker, così un ticker rotto non svuota il gruppo
+    failed = {ch[0] for ch, r in zip(chunks, res) if r is None and len(ch) == 1}
+    retry = [t for ch, r in zip(chunks, res) if r is None and len(ch) > 1 for t in ch]
+    if retry:
+        with timer("fetch"): again = sched.map([job([t]) for t in retry], p.concurrency)
+        failed |= {t for t, r in zip(retry, again) if r is None}
+        res += again
+    out = {}
+    for got in res:
+        if got: out.update({t: _ensure_series1d(s).dropna() for t, s in got.items()})
+    # byte del payload decodificato (valori + date), per ticker: yfinance non espone quelli di rete
+    for t, s in out.items(): add_bytes(t, s.memory_usage(index=True))
+    return out, failed
+
+def fetch_report() -> pd.DataFrame:
+    """Latenza e fallimenti per ticker del fetch scheduler."""
+    return get_scheduler().report()
+
+STORE_TTL = pd.Timedelta(hours=1)
+
+def _topup_anchor(s: pd.Series, checked: pd.Timestamp) -> pd.Timestamp | None:
+    """
+    Barra di controllo del top-up: la più recente prima dell'ultima salvata e del giorno dell'ultimo
+    salvataggio. L'ultima barra può essere quella di una seduta ancora aperta, che cambia fino alla chiusura.
+    """
+    i = s.index.searchsorted(min(s.index[-1], checked.normalize())) - 1
+    return s.index[i] if i >= 0 else None
+
+def _download_stored(tickers: list[str], start: pd.Timestamp, field: str) -> dict[str, pd.Series]:
+    """
+    Come `_download`, ma passa dallo store su disco: scarica solo le barre dopo l'ultima salvata.
+    Se alcuni download falliscono solleva `FetchFailed` con le serie degli altri ticker.
+    """
+    store = get_store()
+    if store is None:
+        out, failed = _download(tickers, start, field)
+        if failed: raise FetchFailed(out, failed)
+        return out
+    now = pd.Timestamp.now(); full, topup, old = [], {}, {}
+    for t in tickers:
+        meta = store.meta(t)
+        if meta is None or pd.Timestamp(meta["start"]) > start: full.append(t)
+        elif now - pd.Timestamp(meta["checked"]) > STORE_TTL:
+            s = store.load(t)
+            anchor = None if s is None or s.empty else _topup_anchor(s, pd.Timestamp(meta["checked"]))
+            if anchor is None: full.append(t)
+            else: topup[t], old[t] = anchor, s[anchor]
+    if topup:
+        # Download incrementale dalla barra di controllo di ciascun ticker (inclusa): se è cambiata lo
+        # storico è stato riaggiustato e si riscarica tutto, altrimenti la coda in comune si sovrascrive
+        got, failed = _download(list(topup), min(topup.values()), field, since=topup)
+        for t, anchor in topup.items():
+            if t in failed: continue            # né touch né barre: il refresh risulta fallito
+            new = got.get(t)
+            if new is None or new.empty: store.touch(t); continue
+            if anchor in new.index and not np.isclose(new[anchor], old[t], rtol=1e-6): full.append(t)
+            else: store.append(t, new[new.index >= anchor], now)
+    else: failed = set()
+    if full:
+        got, lost = _download(full, start, field); failed |= lost
+        for t in full:
+            if t in got: store.write(t, got[t], start, now)
+            elif t not in lost: store.touch(t)  # la copertura si allarga solo con dati scritti
+    out = {}
+    for t in tickers:
+        if t in failed: continue
+        s = store.load(t)
+        if s is None: continue
+        s = s[s.index >= start]
+        if not s.empty: out[t] = s
+    if failed: raise FetchFailed(out, failed)
+    return out
+
+def _usd_per_ccy_download(ccys: list[str], start: pd.Timestamp) -> dict[str, pd.Series]:
+    by_ccy = lambda got: {c: got[_fx_key(c)] for c in ccys if _fx_key(c) in got}
+    try:
+        return by_ccy(_download_stored([_fx_key(c) for c in ccys], start, FX_FIELD))
+    except FetchFailed as e:
+        raise FetchFailed(by_ccy(e.got), {t[:-5] for t in e.failed}) from None
+
+def _peek_stored(ticker: str, start: pd.Timestamp) -> tuple[pd.Series, pd.Timestamp] | None:
+    store = get_store(); meta = store.meta(ticker) if store is not None else None
+    if meta is None or pd.Timestamp(meta["start"]) > start: return None
+    s = store.load(ticker)
+    return None if s is None or s.empty else (s, pd.Timestamp(meta["checked"]))
+
+def _peek_fx(ccy: str, start: pd.Timestamp) -> tuple[pd.Series, pd.Timestamp] | None:
+    return _peek_stored(_fx_key(ccy), start)
+
+SWR = os.environ.get("WEI_SWR", "1") != "0"
+PRICES = SWRCache(lambda ts, start: _download_stored(ts, start, "Adj Close"), STORE_TTL, SWR, _peek_stored,
+                  name="fetch_series")
+FX = SWRCache(_usd_per_ccy_download, STORE_TTL, SWR, _peek_fx, name="usd_per_ccy")
+
+def _usd_flat(start: pd.Timestamp) -> pd.Series:
+    return pd.Series(1.0, index=pd.date_range(start=start, end=today(), freq="B"))
+
 def fetch_series(ticker: str, start_str: str | pd.Timestamp) -> pd.Series:
-    start = pd.to_datetime(start_str)
-    df = yf.download(ticker, start=start, end=today + pd.Timedelta(days=1),
-                     interval="1d", auto_adjust=False, progress=False)
-    if df.empty: return pd.Series(dtype=float)
-    s = df["Adj Close"] if "Adj Close" in df.columns else df["Close"]
-    return _ensure_series1d(s).dropna()
+    return PRICES.get([ticker], pd.to_datetime(start_str)).get(ticker, _EMPTY)
 
-@st.cache_data(show_spinner=False, ttl=60*60)
 def usd_per_ccy(ccy: str, start_str: str | pd.Timestamp) -> pd.Series:
     start = pd.to_datetime(start_str)
-    if ccy == "USD":
-        return pd.Series(1.0, index=pd.date_range(start=start, end=today, freq="B"))
-    df = yf.download(f"{ccy}USD=X", start=start, end=today + pd.Timedelta(days=1),
-                     interval="1d", auto_adjust=False, progress=False)
-    if not df.empty and "Close" in df: s = df["Close"]
-    else:
-        df2 = yf.download(f"USD{ccy}=X", start=start, end=today + pd.Timedelta(days=1),
-                          interval="1d", auto_adjust=False, progress=False)
-        if df2.empty or "Close" not in df2: return pd.Series(dtype=float)
-        s = 1.0/df2["Close"]
-    return _ensure_series1d(s).dropna()
+    if ccy == "USD": return _usd_flat(start)
+    return FX.get([ccy], start).get(ccy, _EMPTY)
+
+def fetch_many(tickers: tuple[str, ...], start_str: str | pd.Timestamp,
+               block: bool = False) -> dict[str, pd.Series]:
+    """Tutti i ticker in un colpo: le serie note escono subito, i download mancanti vanno in batch."""
+    return PRICES.get(list(dict.fromkeys(tickers)), pd.to_datetime(start_str), block)
+
+def usd_per_many(ccys: tuple[str, ...], start_str: str | pd.Timestamp,
+                 block: bool = False) -> dict[str, pd.Series]:
+    start = pd.to_datetime(start_str); ccys = list(dict.fromkeys(ccys))
+    out = FX.get([c for c in ccys if c != "USD"], start, block)
+    if "USD" in ccys: out["USD"] = _usd_flat(start)
+    return out
 
 def build_fx_map(needed_ccys: list[str], start: pd.Timestamp) -> dict[str, pd.Series]:
-    ccys = sorted(set(needed_ccys) | set(HARD))
-    return {c: usd_per_ccy(c, start) for c in ccys}
+    return usd_per_many(tuple(sorted(set(needed_ccys))), start)
 
 def convert_series(series_local: pd.Series | pd.DataFrame, local_ccy: str, target_ccy: str,
                    fx_map: dict[str, pd.Series]) -> pd.Series:
@@ -98,10 +200,100 @@ def convert_series(series_local: pd.Series | pd.DataFrame, local_ccy: str, targe
     return _ensure_series1d(s_loc * (usd_local.reindex(s_loc.index).ffill()
                                      / usd_target.reindex(s_loc.index).ffill())).dropna()
 
+def local_panel(names: list[str], start: pd.Timestamp) -> pd.DataFrame:
+    prices = fetch_many(tuple(INDICES[n][0] for n in names), start)
+    return price_matrix({n: prices.get(INDICES[n][0], _EMPTY) for n in names}, names)
+
+def _table_start() -> pd.Timestamp:
+    return period_start("5Y") - pd.DateOffset(months=1)
+
+def _names(names: tuple[str, ...] | list[str] | None) -> list[str]:
+    return list(INDICES) if not names else [n for n in names if n in INDICES]
+
+def _version_ccys(names: list[str], target_ccy: str | None) -> list[str]:
+    """Cambi da cui dipende la selezione: valute locali + `target_ccy` (nessuno in LOCAL, tutte le HARD se None)."""
+    if target_ccy == "LOCAL": return []
+    extra = set(HARD) if target_ccy is None else {target_ccy}
+    return [c for c in sorted(set(INDICES[n][1] for n in names) | extra) if c != "USD"]
+
+def _universe_version(names: tuple[str, ...] | None = None, target_ccy: str | None = None) -> str:
+    names = _names(names)
+    tickers = [INDICES[n][0] for n in names]; ccys = _version_ccys(names, target_ccy)
+    # il giorno fa parte del token: al cambio di data gli orizzonti si spostano anche senza barre nuove
+    return hashlib.sha1(repr((today(), PRICES.version(tickers), FX.version(ccys))).encode()).hexdigest()[:12]
+
+def data_version(start_str: str | pd.Timestamp, names: tuple[str, ...] | None = None,
+                 target_ccy: str | None = None) -> str:
+    """
+    Token dei dati della selezione (default: tutto l'universo) in `target_ccy` (default: tutte le
+    valute); cambia con una barra nuova o col giorno. Scarica solo i cambi che servono a quella valuta.
+    """
+    start = pd.to_datetime(start_str); names = _names(names)
+    PRICES.ensure([INDICES[n][0] for n in names], start)
+    FX.ensure(_version_ccys(names, target_ccy), start)
+    return _universe_version(tuple(names), target_ccy)
+
+def freshness(names: list[str]) -> pd.DataFrame:
+    """Per indice: data dell'ultima barra, età del dato servito e stato (ok / stale / in aggiornamento)."""
+    df = PRICES.status([INDICES[n][0] for n in names])
+    df.index = names
+    return df
+
+def _convert_universe(panel: pd.DataFrame, fx_map: dict[str, pd.Series], target_ccy: str,
+                      start: pd.Timestamp) -> pd.DataFrame:
+    if target_ccy == "LOCAL": return panel
+    lccys = [INDICES[n][1] for n in panel.columns]
+    with timer("fx"): usd = usd_matrix(fx_map, master_calendar(start, today(), panel.index))
+    with timer("convert"): return convert_panel(panel, lccys, target_ccy, usd)
+
+def _table_from(fp: FilledPanel) -> pd.DataFrame:
+    """Rendimenti e metriche di rischio dallo stesso pannello, in cache insieme (stessa chiave e versione)."""
+    with timer("returns"):
+        rets = returns_table(fp, HORIZONS).round(2)
+    with timer("risk"):
+        risk = risk_table(fp, RISK_HORIZONS).round(2)
+    df = pd.concat([pd.Series({n: INDICES[n][1] for n in fp.columns}, name="Local CCY"), rets, risk], axis=1)
+    df.index.name = "Index"
+    return df
+
+def _rebase_start(horizon: str) -> pd.Timestamp:
+    return period_start(horizon) or (today() - pd.DateOffset(days=10))
+
+def _finish_rebased(raw: pd.DataFrame) -> pd.DataFrame | None:
+    df = raw.dropna(axis=1, how="all").dropna(axis=0, how="all")
+    return None if df.empty else df.ffill()
+
+def converted_panel(target_ccy: str, start_str: str | pd.Timestamp, version: str = "",
+                    names: tuple[str, ...] = ()) -> pd.DataFrame:
+    """
+    Prezzi della selezione (default: tutto l'universo) convertiti in `target_ccy`. Non in cache:
+    l'unica copia tenuta in memoria è il `FilledPanel` condiviso di `filled_panel`.
+    """
+    start = pd.to_datetime(start_str); names = _names(names)
+    fx = {} if target_ccy == "LOCAL" else build_fx_map([INDICES[n][1] for n in names] + [target_ccy], start)
+    return _convert_universe(local_panel(names, start), fx, target_ccy, start)
+
+# Risultati calcolati condivisi tra sessioni, per (vista, valuta, orizzonte, selezione) e versione dati
+RESULTS = ResultCache(int(os.environ.get("WEI_RESULT_CACHE_MB", "512")) * 2**20)
+
+def filled_panel(target_ccy: str, start_str: str | pd.Timestamp, version: str,
+                 names: tuple[str, ...] = ()) -> FilledPanel:
+    """Pannello prezzi compatto condiviso tra sessioni (sola lettura): ogni finestra Custom è un searchsorted."""
+    start = pd.to_datetime(start_str)
+    return RESULTS.get(("panel", target_ccy, start, names), version,
+                       lambda: FilledPanel(converted_panel(target_ccy, start, version, names)))
+
+def perf_table(target_ccy: str, start_str: str | pd.Timestamp, version: str,
+               names: tuple[str, ...] = ()) -> pd.DataFrame:
+    """Tabella rendimenti condivisa (sola lettura: chi la modifica lavora su `copy(deep=False)`)."""
+    start = pd.to_datetime(start_str)
+    return RESULTS.get(("table", target_ccy, start, names), version,
+                       lambda: _table_from(filled_panel(target_ccy, start, version, names)))
+
 def _prev_close_before(s: pd.Series, dt: pd.Timestamp):
-    s2 = s[s.index < dt];  return None if s2.empty else float(s2.iloc[-1])
+    i = s.index.searchsorted(dt, side="left");  return None if i == 0 else float(s.iloc[i-1])
 def _last_close_on_or_before(s: pd.Series, dt: pd.Timestamp):
-    s2 = s[s.index <= dt]; return None if s2.empty else float(s2.iloc[-1])
+    i = s.index.searchsorted(dt, side="right"); return None if i == 0 else float(s.iloc[i-1])
 
 def pct_return(series: pd.Series | pd.DataFrame, horizon: str):
     s = _ensure_series1d(series).dropna()
@@ -118,7 +310,7 @@ def pct_return(series: pd.Series | pd.DataFrame, horizon: str):
         base = _prev_close_before(s, start_dt)
         if base is None or base <= 0: return None
         return (last/base - 1.0)*100.0
-    start = period_start(horizon); s2 = s[s.index >= start] if start is not None else s
+    start = period_start(horizon); s2 = s.iloc[s.index.searchsorted(start):] if start is not None else s
     if s2.empty or s2.iloc[0] <= 0: return None
     return (s2.iloc[-1]/s2.iloc[0] - 1.0)*100.0
 
@@ -134,42 +326,167 @@ def ret_custom(series: pd.Series | pd.DataFrame, start_date, end_date):
     if base is None or last is None or base <= 0: return None
     return (last/base - 1.0)*100.0
 
-def compute_table(target_ccy: str):
-    start_min = period_start("5Y") - pd.DateOffset(months=1)
-    fx_map = {} if target_ccy=="LOCAL" else build_fx_map([ccy for _,ccy in INDICES.values()], start_min)
-    rows, conv_px = [], {}
-    for name,(tkr,lcy) in INDICES.items():
-        px_local = fetch_series(tkr, start_min)
-        if px_local.empty:
-            rows.append({"Index":name,"Local CCY":lcy, **{h:None for h in HORIZONS}})
-            continue
-        px_conv = convert_series(px_local, lcy, target_ccy, fx_map)
-        conv_px[name] = px_conv
-        row = {"Index":name,"Local CCY":lcy}
-        for h in HORIZONS:
-            r = pct_return(px_conv, h); row[h] = None if r is None else round(r,2)
-        rows.append(row)
-    df = pd.DataFrame(rows).set_index("Index")
-    return df, conv_px
-
-def build_series_rebased(name_list: list[str], target_ccy: str, horizon: str) -> pd.DataFrame | None:
-    start = period_start(horizon) or (today - pd.DateOffset(days=10))
-    need_ccy = [INDICES[n][1] for n in name_list] if target_ccy != "LOCAL" else []
-    fx_map = build_fx_map(need_ccy, start - pd.DateOffset(months=1)) if need_ccy else {}
-
-    cols = {}
-    for name in name_list:
-        tkr, lcy = INDICES[name]
-        s_local = fetch_series(tkr, start)
-        s_tgt = s_local if target_ccy == "LOCAL" else convert_series(s_local, lcy, target_ccy, fx_map)
-        s = _ensure_series1d(s_tgt).dropna()
-        if s.empty: continue
-        s = s[s.index >= (period_start(horizon) or s.index.min())]
-        cols[name] = s
-
-    if not cols: return None
-
-    df = pd.concat(cols, axis=1).sort_index().ffill()
-    base = df.apply(lambda s: s.dropna().iloc[0] if s.dropna().size else np.nan)
-    df = (df / base) * 100.0
-    return df
+def load_universe(start: pd.Timestamp) -> tuple[dict[str, pd.Series], dict[str, pd.Series]]:
+    """Prezzi e FX di tutto l'universo, riscaricando in linea ciò che è scaduto (thread di warm-up)."""
+    prices = fetch_many(tuple(tkr for tkr,_ in INDICES.values()), start, block=True)
+    fx = usd_per_many(tuple(sorted(set(ccy for _,ccy in INDICES.values()) | set(HARD))), start, block=True)
+    return prices, fx
+
+def compute_table(target_ccy: str, names: list[str] | None = None) -> tuple[pd.DataFrame, FilledPanel]:
+    """
+    Tabella rendimenti e rischio + indice prezzi per la colonna Custom, solo per `names` (default: tutto
+    l'universo): si scaricano e calcolano le sole righe visibili. Memoizzati per selezione e versione dati.
+    """
+    snap = current_snapshot()
+    if snap is not None and target_ccy in snap.panels:
+        fp = snap.panels[target_ccy]
+        t = snap.tables.get(target_ccy)
+        # snapshot di un giorno precedente (es. export notturno) o senza metriche di rischio:
+        # stessi prezzi, tabella ricalcolata con le ancore di oggi
+        t = (t if t is not None and snap.built.normalize() == today() and set(RISK_COLS) <= set(t.columns)
+             else RESULTS.get(("table", target_ccy, "snapshot"), f"{snap.version}:{today()}", lambda: _table_from(fp)))
+        return (t.copy(deep=False) if names is None else t.loc[t.index.intersection(names, sort=False)], fp)
+    sel = () if names is None else tuple(n for n in names if n in INDICES)
+    if len(sel) == len(INDICES): sel = ()          # tutto l'universo: stessa cache del caso base
+    elif names is not None and not sel:
+        return _table_from(FilledPanel(pd.DataFrame(dtype=float))), FilledPanel(pd.DataFrame(dtype=float))
+    start_min = _table_start(); ver = data_version(start_min, sel or None, target_ccy)
+    return perf_table(target_ccy, start_min, ver, sel).copy(deep=False), filled_panel(target_ccy, start_min, ver, sel)
+
+def custom_column(conv_px: FilledPanel | pd.DataFrame, names: list[str], start_date, end_date) -> pd.Series:
+    """Colonna Custom per tutti gli indici in un colpo (stessa semantica di `ret_custom`)."""
+    if not start_date and not end_date:
+        start_date, end_date = ytd_default_window()
+    with timer("returns.custom"):
+        return custom_returns(conv_px, start_date, end_date).reindex(names).round(2)
+
+def selection_version(names: tuple[str, ...], target_ccy: str) -> str:
+    """Versione dati di una selezione: quella dello snapshot se copre la valuta, altrimenti dei prezzi."""
+    snap = current_snapshot()
+    return (snap.version if snap is not None and target_ccy in snap.panels
+            else data_version(_table_start(), names, target_ccy))
+
+def build_series_rebased(name_list: list[str], target_ccy: str, horizon: str,
+                         max_points: int | None = None) -> pd.DataFrame | None:
+    """
+    Serie rebased=100 (sola lettura, condivise tra sessioni per selezione e versione dati);
+    con `max_points` ogni traccia è decimata (LTTB) per il render veloce.
+    """
+    names = tuple(n for n in name_list if n in INDICES)
+    if not names: return None
+    def build():
+        df = _rebased(list(names), target_ccy, horizon)
+        return decimate_frame(df, max_points) if max_points and df is not None else df
+    return RESULTS.get(("rebased", target_ccy, horizon, today(), names, max_points or 0),
+                       selection_version(names, target_ccy), build)
+
+def correlation(name_list: list[str], target_ccy: str, horizon: str, min_periods: int = 20) -> pd.DataFrame | None:
+    """
+    Correlazione dei rendimenti giornalieri nella finestra dell'orizzonte (ogni indice sul suo
+    calendario, ogni coppia sulle date in comune); in cache come le serie rebased.
+    """
+    names = tuple(n for n in name_list if n in INDICES)
+    if len(names) < 2: return None
+    def build():
+        cols = _columns(list(names), target_ccy)
+        if len(cols) < 2: return None
+        t0 = _rebase_start(horizon)
+        panel = price_matrix({n: s.iloc[s.index.searchsorted(t0):].dropna() for n, s in cols.items()}, list(cols))
+        with timer("risk.corr"):
+            c = corr_matrix(daily_returns(FilledPanel(panel, dtype=float)), min_periods)
+        return pd.DataFrame(c, index=panel.columns, columns=panel.columns)
+    return RESULTS.get(("corr", target_ccy, horizon, today(), names, min_periods),
+                       selection_version(names, target_ccy), build)
+
+def _converted_column(name: str, target_ccy: str, start: pd.Timestamp) -> pd.Series:
+    """Storico canonico (da `_table_start`) di un indice convertito, in cache per indice, valuta e versione."""
+    tkr, lccy = INDICES[name]
+    # prima i dati (dalla cache SWR se caldi), poi la versione: un download a freddo la sposta
+    s = fetch_many((tkr,), start).get(tkr, _EMPTY)
+    fx = build_fx_map([lccy, target_ccy], start) if target_ccy != "LOCAL" and not s.empty else None
+    ver = repr((PRICES.version([tkr]), FX.version([lccy, target_ccy])))
+    def build():
+        if fx is None: return s
+        return _convert_universe(s.to_frame(name), fx, target_ccy, start)[name].dropna()
+    return RESULTS.get(("column", name, target_ccy, start), ver, build)
+
+def _columns(name_list: list[str], target_ccy: str) -> dict[str, pd.Series]:
+    """
+    Storico canonico di ogni indice: vista sul pannello dello snapshot, o serie convertita in
+    cache. Cambiare orizzonte o aggiungere un indice non riscarica né riconverte le altre colonne.
+    """
+    snap = current_snapshot()
+    if snap is not None and target_ccy in snap.panels:
+        fp = snap.panels[target_ccy]
+        return {n: fp.column(n) for n in name_list if n in fp.columns}
+    start = _table_start()
+    return {n: _converted_column(n, target_ccy, start) for n in name_list}
+
+def _rebased(name_list: list[str], target_ccy: str, horizon: str) -> pd.DataFrame | None:
+    """Ogni colonna è una fetta dello storico canonico del suo indice, divisa per il primo valore."""
+    t0 = _rebase_start(horizon); out = {}
+    for n, s in _columns(name_list, target_ccy).items():
+        s = s.iloc[s.index.searchsorted(t0):].dropna()
+        if len(s): out[n] = s / s.iloc[0] * 100.0
+    return _finish_rebased(pd.concat(out, axis=1, sort=True)) if out else None
+
+def last_close(ticker: str) -> float | None:
+    """Ultima chiusura giornaliera nota di un ticker o di un cambio XXXUSD=X (base del feed quotazioni finto)."""
+    start = _table_start()
+    s = (usd_per_ccy(ticker[:3], start) if ticker.endswith("USD=X") and len(ticker) == 8
+         else fetch_series(ticker, start))
+    return float(s.iloc[-1]) if len(s) else None
+
+def _fx_quote_tickers(ccys) -> list[str]:
+    return [f"{c}USD=X" for c in ccys if c not in ("USD", "LOCAL")]
+
+def live_1d(names: list[str], target_ccy: str, panel: FilledPanel | None = None) -> pd.Series:
+    """
+    1D intraday in `target_ccy`: ultimo prezzo del poller quotazioni (convertito col cambio live, o
+    con l'ultimo cambio giornaliero) contro la chiusura precedente già in memoria. Nessuno storico
+    ricalcolato; NaN dove manca una quotazione della seduta di oggi.
+    """
+    from utils.quotes import get_quote_poller
+    names = [n for n in names if n in INDICES]
+    ccys = [] if target_ccy == "LOCAL" else sorted({INDICES[n][1] for n in names} | {target_ccy})
+    poller = get_quote_poller()
+    poller.watch([INDICES[n][0] for n in names] + _fx_quote_tickers(ccys))
+    q, day, start = poller.quotes(), today(), _table_start()
+    usd = {}
+    for c in ccys:
+        fx = q.get(f"{c}USD=X")
+        usd[c] = 1.0 if c == "USD" else fx.price if fx is not None else last_close(f"{c}USD=X")
+    out = {}
+    for n in names:
+        tkr, lccy = INDICES[n]; x = q.get(tkr)
+        if x is None or x.ts.normalize() < day: continue
+        s = panel.column(n).dropna() if panel is not None and n in panel.columns else _converted_column(n, target_ccy, start)
+        prev = _prev_close_before(s, day)
+        px = x.price if target_ccy == "LOCAL" else x.price * (usd.get(lccy) or np.nan) / (usd.get(target_ccy) or np.nan)
+        if prev is not None and prev > 0: out[n] = (px / prev - 1.0) * 100.0
+    return pd.Series(out, dtype=float).reindex(names)
+
+def patch_rebased_live(df: pd.DataFrame | None, target_ccy: str) -> pd.DataFrame | None:
+    """
+    Serie rebased con l'ultimo punto (oggi) dalle quotazioni live: valore alla chiusura precedente
+    × (1 + 1D live). Restituisce un frame nuovo: quello condiviso in cache non viene toccato.
+    """
+    if df is None or df.empty: return df
+    day = today(); base = df[df.index < day]
+    if base.empty: return df
+    live = live_1d(list(df.columns), target_ccy).dropna()
+    if live.empty: return df
+    prev = base.ffill().iloc[-1]               # pannelli decimati: l'ultima riga può avere NaN
+    now = (prev * (1.0 + live.reindex(df.columns) / 100.0)).fillna(df.loc[day] if day in df.index else prev)
+    return pd.concat([base, now.to_frame(day).T])
+
+def build_snapshot(ccys: list[str] = CCY_OPTIONS) -> Snapshot:
+    """Scarica/aggiorna tutto l'universo e precalcola tabelle e pannelli prezzi per ogni valuta."""
+    start = _table_start(); names = list(INDICES)
+    prices, fx = load_universe(start)
+    local = price_matrix({n: prices.get(INDICES[n][0], _EMPTY) for n in names}, names)
+    tables, panels = {}, {}
+    for c in ccys:
+        conv = _convert_universe(local, fx, c, start)
+        panels[c] = FilledPanel(conv); tables[c] = _table_from(panels[c])
+    return Snapshot(_universe_version(), pd.Timestamp.now(), tables, panels)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+# Orizzonti corti: pochi punti, non serve decimare
+_NO_DECIMATION = {"1D", "1W", "MTD"}
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indici di `n_out` punti che conservano la forma della serie
+    (picchi e minimi inclusi). Primo e ultimo punto sono sempre tenuti.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3: return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)   # n_out-2 bucket interni
+    out = np.empty(n_out, dtype=int); out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()       # media del bucket successivo
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area)); out[i + 1] = a
+    return out
+
+def point_budget(horizon: str, width_px: int) -> int | None:
+    """Punti per traccia: circa uno ogni 2 px di larghezza; None = nessuna decimazione."""
+    if horizon in _NO_DECIMATION: return None
+    return max(200, int(width_px) // 2)
+
+def decimate_frame(df: pd.DataFrame, n_out: int) -> pd.DataFrame:
+    """
+    LTTB colonna per colonna; righe = unione dei punti scelti, NaN altrove
+    (il grafico usa `connectgaps=True`, quindi ogni traccia resta continua).
+    """
+    if df is None or len(df) <= n_out: return df
+    x_all = df.index.values.astype("datetime64[ns]").astype(np.int64).astype(float)
+    keep = np.zeros(len(df), dtype=bool)
+    cols = {}
+    for c in df.columns:
+        y = df[c].to_numpy(dtype=float)
+        pos = np.flatnonzero(~np.isnan(y))
+        sel = pos[lttb(x_all[pos], y[pos], n_out)] if len(pos) else pos
+        keep[sel] = True
+        col = np.full(len(y), np.nan); col[sel] = y[sel]; cols[c] = col
+    return pd.DataFrame(cols, index=df.index).loc[keep]
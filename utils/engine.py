@@ -0,0 +1,211 @@
+from __future__ import annotations
+import os
+import numpy as np
+import pandas as pd
+
+from utils.trading_calendar import TradingCalendar
+
+def price_matrix(series: dict[str, pd.Series], columns: list[str] | None = None) -> pd.DataFrame:
+    """Allinea le serie (già pulite) in una matrice data×ticker; NaN dove il ticker non quota."""
+    cols = [c for c in (columns or list(series)) if c in series and not series[c].empty]
+    if not cols: return pd.DataFrame(index=pd.DatetimeIndex([]), columns=columns or [], dtype=float)
+    return pd.concat({c: series[c] for c in cols}, axis=1, sort=True).reindex(columns=columns or cols)
+
+# float32 dimezza la memoria dei pannelli condivisi (errore ~1e-7 relativo, sotto l'arrotondamento a 0.01%)
+PANEL_DTYPE = np.dtype(os.environ.get("WEI_PANEL_DTYPE", "float64"))
+
+class FilledPanel:
+    """
+    Matrice prezzi compatta e in sola lettura, condivisa tra sessioni: un indice date, un array 2-D
+    contiguo dei prezzi (`values`, float64 o float32) e, per colonna, la riga dell'ultimo/prossimo
+    prezzo valido (`fidx`/`bidx`, int16 o int32). Ogni ancora (ultimo prezzo prima di una data,
+    primo prezzo da una data) è un `searchsorted` sull'indice date + due gather.
+    """
+
+    def __init__(self, panel: pd.DataFrame, dtype: np.dtype | str | None = None):
+        self.columns = list(panel.columns)
+        self._pos = {c: i for i, c in enumerate(self.columns)}
+        self.calendar = TradingCalendar(panel.index.values)   # indice già ordinato (price_matrix)
+        self.dates = self.calendar.dates
+        self.values = np.ascontiguousarray(panel.to_numpy(dtype=float, na_value=np.nan), dtype=dtype or PANEL_DTYPE)
+        n, k = self.values.shape
+        itype = np.int16 if n < np.iinfo(np.int16).max else np.int32
+        valid = ~np.isnan(self.values)
+        rows = np.arange(n, dtype=itype)[:, None]
+        self.fidx = np.maximum.accumulate(np.where(valid, rows, itype(-1)), axis=0)
+        self.bidx = np.ascontiguousarray(np.minimum.accumulate(np.where(valid, rows, itype(n))[::-1], axis=0)[::-1])
+        self.last_row = self.fidx[-1].astype(np.int64) if n else np.full(k, -1)
+        self.n, self.k = n, k
+        for a in (self.values, self.fidx, self.bidx, self.last_row): a.flags.writeable = False
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.dates, self.values, self.fidx, self.bidx))
+
+    def _gather(self, idx: np.ndarray, rows: np.ndarray, ok: np.ndarray) -> np.ndarray:
+        cols = np.arange(self.k)
+        src = idx[np.clip(rows, 0, self.n - 1), cols]
+        ok = ok & (src >= 0) & (src < self.n)
+        return np.where(ok, self.values[np.clip(src, 0, self.n - 1), cols].astype(float), np.nan)
+
+    def at_or_before(self, rows: np.ndarray) -> np.ndarray:
+        """Ultimo prezzo valido alla riga `rows` (per colonna); NaN se la riga è < 0."""
+        if not self.n: return np.full(self.k, np.nan)
+        rows = np.broadcast_to(rows, (self.k,))
+        return self._gather(self.fidx, rows, rows >= 0)
+
+    def from_row(self, rows: np.ndarray) -> np.ndarray:
+        """Primo prezzo valido dalla riga `rows` in poi (per colonna); NaN se oltre la fine."""
+        if not self.n: return np.full(self.k, np.nan)
+        rows = np.broadcast_to(rows, (self.k,))
+        return self._gather(self.bidx, rows, rows < self.n)
+
+    def last(self) -> np.ndarray:
+        return self.at_or_before(self.last_row)
+
+    def row_before(self, dt) -> np.ndarray:
+        """Indice dell'ultima riga con data < dt (scalare o array per colonna)."""
+        return self.calendar.row_before(dt)
+
+    def row_on_or_before(self, dt) -> np.ndarray:
+        return self.calendar.row_on_or_before(dt)
+
+    def frame(self) -> pd.DataFrame:
+        """Vista DataFrame (senza copia, sola lettura) dei prezzi grezzi, NaN dove il ticker non quota."""
+        return pd.DataFrame(self.values, index=pd.DatetimeIndex(self.dates), columns=self.columns, copy=False)
+
+    def column(self, name: str) -> pd.Series:
+        """Vista (senza copia, sola lettura) di una colonna, NaN dove il ticker non quota."""
+        return pd.Series(self.values[:, self._pos[name]], index=pd.DatetimeIndex(self.dates), name=name, copy=False)
+
+def _pct(last: np.ndarray, base: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(base > 0, (last / base - 1.0) * 100.0, np.nan)
+
+def returns_table(panel: pd.DataFrame | FilledPanel, horizons: list[str],
+                  starts: dict[str, pd.Timestamp | None] | None = None) -> pd.DataFrame:
+    """
+    Rendimenti % per tutti gli orizzonti in blocco, con la stessa semantica di `pct_return`:
+    1D = ultime due chiusure, MTD/YTD = chiusura precedente all'inizio del mese/anno
+    dell'ultima barra, altri = prima barra dalla data di inizio. Senza `starts` si usano le
+    ancore di oggi del calendario del pannello (calcolate una volta al giorno).
+    """
+    fp = panel if isinstance(panel, FilledPanel) else FilledPanel(panel)
+    if not fp.n: return pd.DataFrame(np.nan, index=fp.columns, columns=horizons)
+    last = fp.last()
+    has = fp.last_row >= 0
+    last_dates = fp.dates[np.clip(fp.last_row, 0, None)]
+    out = {}
+    for h in horizons:
+        if h == "1D":
+            r = _pct(last, fp.at_or_before(fp.last_row - 1))
+        elif h in ("MTD", "YTD"):
+            anchor = (last_dates.astype("datetime64[M]") if h == "MTD"
+                      else last_dates.astype("datetime64[Y]")).astype("datetime64[ns]")
+            r = _pct(last, fp.at_or_before(fp.row_before(anchor)))
+        else:
+            if starts is None: before = fp.calendar.anchor_rows().get(h)
+            else: before = None if starts.get(h) is None else fp.row_before(starts[h])
+            first = fp.from_row((before if before is not None else -1) + 1)
+            r = _pct(last, first)
+        out[h] = np.where(has, r, np.nan)
+    return pd.DataFrame(out, index=fp.columns, columns=horizons)
+
+def custom_returns(panel: pd.DataFrame | FilledPanel, start_date, end_date) -> pd.Series:
+    """Rendimento % tra la chiusura precedente a `start_date` e l'ultima chiusura entro `end_date`."""
+    fp = panel if isinstance(panel, FilledPanel) else FilledPanel(panel)
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    if start.month == 12 and start.day == 31 and end.year == start.year + 1:
+        start = pd.Timestamp(end.year, 1, 1)
+    base = fp.at_or_before(fp.row_before(start))
+    last = fp.at_or_before(fp.row_on_or_before(end))
+    return pd.Series(_pct(last, base), index=fp.columns, dtype=float)
+
+TRADING_DAYS = 252
+RISK_KEYS = ("Vol", "MaxDD", "Sharpe")
+
+def daily_returns(panel: pd.DataFrame | FilledPanel) -> np.ndarray:
+    """
+    Rendimenti giornalieri (n×k) sul calendario di ciascuno strumento: ogni barra contro la barra
+    valida precedente; NaN dove lo strumento non quota e alla sua prima barra.
+    """
+    fp = panel if isinstance(panel, FilledPanel) else FilledPanel(panel)
+    r = np.full((fp.n, fp.k), np.nan)
+    if fp.n < 2: return r
+    cols = np.arange(fp.k)
+    src = fp.fidx[:-1]
+    prev = np.where(src >= 0, fp.values[np.clip(src, 0, None), cols], np.nan).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r[1:] = np.where(prev > 0, fp.values[1:].astype(float) / prev - 1.0, np.nan)
+    return r
+
+def _base_rows(fp: FilledPanel, h: str, starts: dict[str, pd.Timestamp | None] | None) -> np.ndarray:
+    """Riga del prezzo base di ogni colonna per l'orizzonte `h` (stesse ancore di `returns_table`); -1 se manca."""
+    cols = np.arange(fp.k)
+    if h in ("MTD", "YTD"):
+        last_dates = fp.dates[np.clip(fp.last_row, 0, None)]
+        anchor = (last_dates.astype("datetime64[M]") if h == "MTD"
+                  else last_dates.astype("datetime64[Y]")).astype("datetime64[ns]")
+        rows = fp.row_before(anchor)
+        return np.where(rows >= 0, fp.fidx[np.clip(rows, 0, None), cols], -1).astype(np.int64)
+    if starts is None: before = fp.calendar.anchor_rows().get(h)
+    else: before = None if starts.get(h) is None else int(fp.row_before(starts[h]))
+    first = (before if before is not None else -1) + 1
+    if first >= fp.n: return np.full(fp.k, -1, dtype=np.int64)
+    b = fp.bidx[first].astype(np.int64)
+    return np.where(b < fp.n, b, -1)
+
+def risk_table(panel: pd.DataFrame | FilledPanel, horizons: list[str],
+               starts: dict[str, pd.Timestamp | None] | None = None, rf: float = 0.0) -> pd.DataFrame:
+    """
+    Volatilità annualizzata (%), max drawdown (%) e Sharpe (tasso `rf` annuo) per orizzonte, in blocco
+    su tutto il pannello: rendimenti giornalieri una volta sola, poi somme cumulative (media e varianza
+    di ogni finestra in O(1)) e massimo progressivo dei prezzi per il drawdown. La finestra parte dal
+    prezzo base dello stesso orizzonte in `returns_table`. Colonne "Vol 1Y", "MaxDD 1Y", "Sharpe 1Y", ...
+    """
+    fp = panel if isinstance(panel, FilledPanel) else FilledPanel(panel)
+    names = [f"{m} {h}" for m in RISK_KEYS for h in horizons]
+    if not fp.n: return pd.DataFrame(np.nan, index=fp.columns, columns=names)
+    cols = np.arange(fp.k)
+    r = daily_returns(fp); ok = ~np.isnan(r); r0 = np.where(ok, r, 0.0)
+    zero = np.zeros((1, fp.k))
+    c1 = np.vstack([zero, np.cumsum(r0, axis=0)])        # c[i] = somma delle righe < i
+    c2 = np.vstack([zero, np.cumsum(r0 * r0, axis=0)])
+    cn = np.vstack([zero, np.cumsum(ok, axis=0, dtype=float)])
+    px = np.where(fp.fidx >= 0, fp.values[np.clip(fp.fidx, 0, None), cols], np.nan).astype(float)   # ffill
+    rows = np.arange(fp.n)[:, None]
+    out = {}
+    for h in horizons:
+        b = _base_rows(fp, h, starts); has = b >= 0
+        lo = np.clip(b + 1, 0, fp.n)
+        s1, s2, n = c1[-1] - c1[lo, cols], c2[-1] - c2[lo, cols], cn[-1] - cn[lo, cols]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = s1 / n
+            var = (s2 - s1 * mean) / (n - 1)
+            sd = np.where(has & (n >= 2) & (var > 0), np.sqrt(np.clip(var, 0, None)), np.nan)
+            vol = sd * np.sqrt(TRADING_DAYS)
+            out[f"Vol {h}"] = vol * 100.0
+            out[f"Sharpe {h}"] = (mean * TRADING_DAYS - rf) / vol
+        first = int(b[has].min()) if has.any() else fp.n
+        win = np.where((rows[first:] >= b) & has, px[first:], np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dd = win / np.fmax.accumulate(win, axis=0) - 1.0
+        mdd = np.where(np.isnan(dd), np.inf, dd).min(axis=0) if len(dd) else np.full(fp.k, np.inf)
+        out[f"MaxDD {h}"] = np.where(np.isfinite(mdd) & has, mdd * 100.0, np.nan)
+    return pd.DataFrame(out, index=fp.columns, columns=names)
+
+def corr_matrix(returns: np.ndarray, min_periods: int = 20) -> np.ndarray:
+    """
+    Correlazione a coppie (k×k) di rendimenti con buchi (NaN), ogni coppia sulle sole date in comune,
+    come `DataFrame.corr()` ma con qualche prodotto di matrici al posto di un ciclo sulle coppie.
+    """
+    ok = ~np.isnan(returns); m = ok.astype(float); x = np.where(ok, returns, 0.0)
+    n = m.T @ m                               # osservazioni in comune
+    sx = x.T @ m                              # sx[i, j] = somma di x_i sulle date comuni a j
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = n * sxy - sx * sx.T
+        den = np.sqrt((n * sxx - sx * sx) * (n * sxx - sx * sx).T)
+        c = np.clip(cov / den, -1.0, 1.0)
+    return np.where((n >= max(min_periods, 2)) & (den > 0), c, np.nan)
@@ -0,0 +1,110 @@
+"""
+Export batch (senza Streamlit) di tabelle rendimenti, pannelli prezzi e serie rebased per tutte
+le valute e gli orizzonti, e rilettura come snapshot precalcolato per la dashboard.
+
+Struttura della cartella:
+    manifest.json                 versione dati, data di build, formato, valute, orizzonti
+    tables/<CCY>.<fmt>            tabella rendimenti (Index × Local CCY + orizzonti)
+    panels/<CCY>.<fmt>            prezzi convertiti (data × indice), fonte di Custom e rebased
+    rebased/<CCY>_<H>.<fmt>       serie rebased=100 di tutto l'universo
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from utils.engine import FilledPanel
+from utils.snapshot import Snapshot, publish_snapshot
+
+log = logging.getLogger(__name__)
+
+FORMATS = ("parquet", "csv", "json")
+
+def _write(df: pd.DataFrame, path: Path, fmt: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    if fmt == "parquet": df.to_parquet(tmp)
+    elif fmt == "csv": df.to_csv(tmp)
+    else: df.to_json(tmp, orient="split", date_format="iso", double_precision=15)
+    os.replace(tmp, path)
+
+def _read(path: Path, fmt: str, dates: bool = False) -> pd.DataFrame:
+    if fmt == "parquet": df = pd.read_parquet(path)
+    elif fmt == "csv": df = pd.read_csv(path, index_col=0)
+    else: df = pd.read_json(path, orient="split", convert_dates=False)
+    if dates: df.index = pd.to_datetime(df.index)
+    return df
+
+def write_snapshot(snap: Snapshot, out: str | Path, fmt: str = "parquet",
+                   rebased: dict[tuple[str, str], pd.DataFrame] | None = None) -> Path:
+    """Scrive lo snapshot in `out`; il manifest per ultimo, così un lettore non vede mai un export a metà."""
+    if fmt not in FORMATS: raise ValueError(f"formato non supportato: {fmt} (validi: {', '.join(FORMATS)})")
+    out = Path(out); rebased = rebased or {}
+    for c, t in snap.tables.items(): _write(t, out / "tables" / f"{c}.{fmt}", fmt)
+    for c, fp in snap.panels.items(): _write(fp.frame(), out / "panels" / f"{c}.{fmt}", fmt)
+    for (c, h), df in rebased.items():
+        if df is not None: _write(df, out / "rebased" / f"{c}_{h}.{fmt}", fmt)
+    manifest = {"version": snap.version, "built": snap.built.isoformat(), "format": fmt,
+                "ccys": list(snap.panels), "horizons": list(dict.fromkeys(h for _, h in rebased))}
+    tmp = out / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2)); os.replace(tmp, out / "manifest.json")
+    return out
+
+def read_snapshot(path: str | Path) -> Snapshot:
+    """Snapshot da una cartella di export: tabelle e pannelli (le serie rebased si ricavano dai pannelli)."""
+    path = Path(path)
+    m = json.loads((path / "manifest.json").read_text())
+    fmt = m["format"]
+    tables = {c: _read(path / "tables" / f"{c}.{fmt}", fmt) for c in m["ccys"]}
+    for t in tables.values(): t.index.name = "Index"
+    panels = {c: FilledPanel(_read(path / "panels" / f"{c}.{fmt}", fmt, dates=True)) for c in m["ccys"]}
+    return Snapshot(m["version"], pd.Timestamp(m["built"]), tables, panels)
+
+def load_from_env() -> Snapshot | None:
+    """Con WEI_SNAPSHOT_DIR pubblica lo snapshot esportato (es. dal job notturno) come fonte precalcolata."""
+    path = os.environ.get("WEI_SNAPSHOT_DIR")
+    if not path or not (Path(path) / "manifest.json").exists(): return None
+    try:
+        snap = read_snapshot(path)
+    except Exception:
+        log.exception("snapshot in %s non leggibile", path)
+        return None
+    publish_snapshot(snap)
+    return snap
+
+def export(out: str | Path, formats: list[str], ccys: list[str] | None = None,
+           horizons: list[str] | None = None, rebased: bool = True) -> Snapshot:
+    """Un solo processo: scarica/aggiorna una volta, calcola ogni valuta e orizzonte, scrive ogni formato."""
+    from utils import data
+    ccys = ccys or data.CCY_OPTIONS; horizons = horizons or data.HORIZONS
+    snap = data.build_snapshot(ccys)
+    publish_snapshot(snap)                 # le serie rebased leggono dai pannelli appena calcolati
+    names = list(data.INDICES)
+    reb = ({(c, h): data.build_series_rebased(names, c, h) for c in ccys for h in horizons} if rebased else {})
+    for fmt in formats:
+        write_snapshot(snap, Path(out) / fmt if len(formats) > 1 else out, fmt, reb)
+    return snap
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Esporta tabelle, pannelli e serie rebased (Parquet/CSV/JSON).")
+    ap.add_argument("--out", default="snapshot", help="cartella di destinazione")
+    ap.add_argument("--format", default="parquet",
+                    help="formati separati da virgola: parquet, csv, json (con più formati: una sottocartella per formato)")
+    ap.add_argument("--ccys", help="valute, separate da virgola (default: tutte)")
+    ap.add_argument("--horizons", help="orizzonti rebased, separati da virgola (default: tutti)")
+    ap.add_argument("--no-rebased", action="store_true", help="solo tabelle e pannelli")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    formats = [f.strip() for f in args.format.split(",") if f.strip()]
+    bad = [f for f in formats if f not in FORMATS]
+    if bad: ap.error(f"formato non supportato: {', '.join(bad)}")
+    t0 = time.perf_counter()
+    snap = export(args.out, formats, args.ccys and args.ccys.split(","),
+                  args.horizons and args.horizons.split(","), not args.no_rebased)
+    log.info("export %s in %s (%s) in %.1fs", snap.version, args.out, ", ".join(formats), time.perf_counter() - t0)
+    return 0
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import os
+import threading
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+
+class Provider:
+    """
+    Fonte dati prezzi: download massivo, incrementale e cambi. Ogni provider dichiara quanti ticker
+    accetta per richiesta (`batch_size`) e quante richieste regge in parallelo (`concurrency`):
+    il livello di fetch spezza e lancia i batch di conseguenza.
+    """
+    name: str = "base"
+    batch_size: int = 40
+    concurrency: int = 4
+
+    def download(self, tickers: list[str], start: pd.Timestamp, end: pd.Timestamp,
+                 field: str = "Adj Close") -> dict[str, pd.Series]:
+        """Storico giornaliero [start, end) di più ticker → {ticker: Series di prezzi}."""
+        raise NotImplementedError
+
+    def download_since(self, since: dict[str, pd.Timestamp], end: pd.Timestamp,
+                       field: str = "Adj Close") -> dict[str, pd.Series]:
+        """Solo le barre da `since[ticker]` (incluso) in poi: una richiesta dal più vecchio, poi si taglia."""
+        if not since: return {}
+        got = self.download(list(since), min(since.values()), end, field)
+        return {t: s[s.index >= since[t]] for t, s in got.items() if t in since}
+
+    def fx(self, ccys: list[str], start: pd.Timestamp, end: pd.Timestamp) -> dict[str, pd.Series]:
+        """USD per unità di valuta: cross diretto XXXUSD=X, altrimenti l'inverso di USDXXX=X."""
+        direct = self.download([f"{c}USD=X" for c in ccys], start, end, "Close")
+        out = {c: direct[f"{c}USD=X"] for c in ccys if f"{c}USD=X" in direct}
+        miss = [c for c in ccys if c not in out]
+        if miss:
+            inv = self.download([f"USD{c}=X" for c in miss], start, end, "Close")
+            out.update({c: (1.0 / inv[f"USD{c}=X"]).dropna() for c in miss if f"USD{c}=X" in inv})
+        return out
+
+# yfinance 0.2.x tiene i risultati di `download()` in variabili globali del modulo (shared._DFS,
+# _ERRORS): due download contemporanei si sovrascrivono. Un download alla volta per processo;
+# il parallelismo per ticker resta dentro yfinance (threads=True).
+YF_LOCK = threading.Lock()
+
+class YFinanceProvider(Provider):
+    """Un solo `yf.download` per gruppo di ticker (al posto di una chiamata per ticker), uno alla volta."""
+    name = "yfinance"
+    concurrency = 1
+    timeout: float = 10.0
+
+    def download(self, tickers: list[str], start: pd.Timestamp, end: pd.Timestamp,
+                 field: str = "Adj Close") -> dict[str, pd.Series]:
+        if not tickers: return {}
+        import yfinance as yf               # pesante (~0.2 s): solo quando serve davvero la rete
+        with YF_LOCK:
+            df = yf.download(list(tickers), start=start, end=end, interval="1d", auto_adjust=False,
+                             progress=False, group_by="column", threads=True, timeout=self.timeout)
+        return split_frame(df, list(tickers), field)
+
+class LocalDirProvider(Provider):
+    """
+    Mirror locale: un file per ticker in `root` (`<ticker>.parquet` o `<ticker>.csv`, nome così
+    com'è o con escape URL), indice date e colonne campo (Close, Adj Close, ...) o una sola colonna.
+    Nessuna rete: batch grandi e letture in parallelo.
+    """
+    name = "local"
+    batch_size = 500
+    concurrency = 8
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _read(self, ticker: str) -> pd.DataFrame | None:
+        for name in dict.fromkeys((ticker, quote(ticker, safe=""))):
+            if "/" in name: continue
+            for ext in ("parquet", "csv"):
+                p = self.root / f"{name}.{ext}"
+                if not p.exists(): continue
+                df = pd.read_parquet(p) if ext == "parquet" else pd.read_csv(p, index_col=0)
+                df.index = pd.to_datetime(df.index)
+                return df.sort_index()
+        return None
+
+    def download(self, tickers: list[str], start: pd.Timestamp, end: pd.Timestamp,
+                 field: str = "Adj Close") -> dict[str, pd.Series]:
+        out = {}
+        for t in tickers:
+            df = self._read(t)
+            if df is None or df.empty: continue
+            col = field if field in df.columns else "Close" if "Close" in df.columns else df.columns[0]
+            s = df[col].loc[(df.index >= start) & (df.index < end)].dropna()
+            if not s.empty: out[t] = s.astype(float)
+        return out
+
+class MemoryProvider(Provider):
+    """Stand-in offline: serve prezzi da un dict in memoria (test, benchmark, sviluppo senza rete)."""
+    name = "memory"
+
+    def __init__(self, prices: dict[str, pd.Series], batch_size: int = 40, concurrency: int = 4):
+        self.prices, self.batch_size, self.concurrency = prices, batch_size, concurrency
+        self.calls = 0
+
+    def download(self, tickers: list[str], start: pd.Timestamp, end: pd.Timestamp,
+                 field: str = "Adj Close") -> dict[str, pd.Series]:
+        self.calls += 1
+        out = {}
+        for t in tickers:
+            s = self.prices.get(t)
+            if s is None: continue
+            s = s[(s.index >= start) & (s.index < end)]
+            if not s.empty: out[t] = s
+        return out
+
+def split_frame(df: pd.DataFrame | None, tickers: list[str], field: str) -> dict[str, pd.Series]:
+    """Spezza l'output (anche MultiIndex campo×ticker) di `yf.download` in serie per ticker."""
+    if df is None or df.empty: return {}
+    if isinstance(df.columns, pd.MultiIndex):
+        fields = df.columns.get_level_values(0)
+        f = field if field in fields else "Close"
+        if f not in fields: return {}
+        sub = df[f]
+    else:
+        f = field if field in df.columns else "Close"
+        if f not in df.columns or len(tickers) != 1: return {}
+        sub = df[[f]].set_axis(tickers, axis=1)
+    out = {}
+    for t in tickers:
+        if t not in sub.columns: continue
+        s = sub[t].dropna()
+        if not s.empty: out[t] = s
+    return out
+
+def provider_from_env() -> Provider:
+    """WEI_PROVIDER_DIR=/percorso/mirror usa il mirror locale; altrimenti yfinance."""
+    root = os.environ.get("WEI_PROVIDER_DIR")
+    return LocalDirProvider(root) if root else YFinanceProvider()
+
+_provider: Provider = provider_from_env()
+
+def get_provider() -> Provider:
+    return _provider
+
+def set_provider(provider: Provider) -> Provider:
+    """Sostituisce la fonte dati (es. MemoryProvider offline); restituisce la precedente."""
+    global _provider
+    prev, _provider = _provider, provider
+    return prev
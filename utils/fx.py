@@ -0,0 +1,36 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+def master_calendar(start: pd.Timestamp, end: pd.Timestamp, *indexes: pd.Index) -> pd.DatetimeIndex:
+    """Giorni lavorativi tra start ed end, più ogni data effettiva delle serie passate."""
+    cal = pd.date_range(start=pd.Timestamp(start).normalize(), end=pd.Timestamp(end).normalize(), freq="B")
+    for ix in indexes:
+        if len(ix): cal = cal.union(pd.DatetimeIndex(ix))
+    return cal
+
+def usd_matrix(fx_map: dict[str, pd.Series], calendar: pd.DatetimeIndex) -> pd.DataFrame:
+    """USD per unità di valuta, una colonna per valuta, allineato e ffill sul calendario master."""
+    cols = {}
+    for c, s in fx_map.items():
+        if c == "USD": cols[c] = pd.Series(1.0, index=calendar)
+        elif s is not None and not s.empty:
+            cols[c] = s[~s.index.duplicated(keep="last")].reindex(calendar.union(s.index)).ffill().reindex(calendar)
+        else: cols[c] = pd.Series(np.nan, index=calendar)
+    return pd.DataFrame(cols, index=calendar)
+
+def convert_panel(panel: pd.DataFrame, local_ccys: list[str], target_ccy: str,
+                  usd: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte tutte le colonne di `panel` (prezzi in valuta locale) in `target_ccy` con un'unica
+    moltiplicazione: prezzo × USD/locale ÷ USD/target, riga per riga.
+    """
+    if target_ccy == "LOCAL" or panel.empty: return panel
+    u = usd.reindex(panel.index)
+    nan = np.full(len(u), np.nan)
+    loc = np.column_stack([u[c].to_numpy() if c in u else nan for c in local_ccys])
+    tgt = u[target_ccy].to_numpy() if target_ccy in u else nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = loc / tgt[:, None]
+    factor[:, [c == target_ccy for c in local_ccys]] = 1.0
+    return pd.DataFrame(panel.to_numpy(dtype=float) * factor, index=panel.index, columns=panel.columns)
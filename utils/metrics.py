@@ -0,0 +1,140 @@
+from __future__ import annotations
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+log = logging.getLogger("wei.metrics")
+
+@dataclass
+class Timing:
+    count: int = 0
+    total: float = 0.0
+    last: float = 0.0
+    max: float = 0.0
+
+class Metrics:
+    """Tempi per fase, contatori (hit/miss cache) e byte scaricati per ticker, per processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: dict[str, Timing] = {}
+        self.counters: dict[str, int] = {}
+        self.bytes: dict[str, int] = {}
+
+    @contextmanager
+    def timer(self, stage: str):
+        t0 = time.perf_counter()
+        try: yield
+        finally:
+            dt = time.perf_counter() - t0
+            with self._lock:
+                t = self.timings.setdefault(stage, Timing())
+                t.count += 1; t.total += dt; t.last = dt; t.max = max(t.max, dt)
+            if log.isEnabledFor(logging.INFO):
+                log.info(json.dumps({"event": "stage", "stage": stage, "seconds": round(dt, 6)}))
+
+    def timed(self, stage: str):
+        """Decoratore: misura ogni chiamata della funzione sotto `stage`."""
+        def deco(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage): return fn(*args, **kwargs)
+            return wrapper
+        return deco
+
+    def incr(self, name: str, n: int = 1):
+        if not n: return
+        with self._lock: self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_bytes(self, key: str, n: int):
+        with self._lock: self.bytes[key] = self.bytes.get(key, 0) + int(n)
+
+    def reset(self):
+        with self._lock: self.timings.clear(); self.counters.clear(); self.bytes.clear()
+
+    def timings_frame(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [{"Fase": k, "Chiamate": v.count, "Ultima (ms)": round(v.last * 1e3, 1),
+                     "Media (ms)": round(v.total / v.count * 1e3, 1), "Max (ms)": round(v.max * 1e3, 1)}
+                    for k, v in sorted(self.timings.items())]
+        return pd.DataFrame(rows).set_index("Fase") if rows else pd.DataFrame()
+
+    def cache_frame(self) -> pd.DataFrame:
+        """Hit/miss per cache: i contatori si chiamano `<cache>.hit|miss|stale`."""
+        with self._lock: counters = dict(self.counters)
+        caches = sorted({k.rsplit(".", 1)[0] for k in counters if k.rsplit(".", 1)[-1] in ("hit", "miss", "stale")})
+        rows = []
+        for c in caches:
+            hit, miss, stale = (counters.get(f"{c}.{x}", 0) for x in ("hit", "miss", "stale"))
+            tot = hit + miss + stale
+            rows.append({"Cache": c, "Hit": hit, "Stale": stale, "Miss": miss,
+                         "Hit rate": f"{(hit + stale) / tot:.0%}" if tot else ""})
+        return pd.DataFrame(rows).set_index("Cache") if rows else pd.DataFrame()
+
+    def bytes_frame(self) -> pd.DataFrame:
+        with self._lock: b = dict(self.bytes)
+        return (pd.DataFrame({"Byte": b}).sort_values("Byte", ascending=False) if b else pd.DataFrame())
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {"timings": {k: vars(v).copy() for k, v in self.timings.items()},
+                    "counters": dict(self.counters), "bytes": dict(self.bytes)}
+
+    def prometheus(self) -> str:
+        """Formato testo Prometheus (esposizione 0.0.4)."""
+        d = self.as_dict(); out = []
+        out += ["# TYPE wei_stage_seconds_total counter", "# TYPE wei_stage_calls_total counter",
+                "# TYPE wei_stage_seconds_max gauge"]
+        for k, v in d["timings"].items():
+            out += [f'wei_stage_seconds_total{{stage="{k}"}} {v["total"]:.6f}',
+                    f'wei_stage_calls_total{{stage="{k}"}} {v["count"]}',
+                    f'wei_stage_seconds_max{{stage="{k}"}} {v["max"]:.6f}']
+        out.append("# TYPE wei_events_total counter")
+        for k, v in d["counters"].items():
+            name, _, kind = k.rpartition(".")
+            out.append(f'wei_events_total{{name="{name or k}",kind="{kind}"}} {v}')
+        out.append("# TYPE wei_download_bytes_total counter")
+        for k, v in d["bytes"].items():
+            out.append(f'wei_download_bytes_total{{ticker="{k}"}} {v}')
+        return "\n".join(out) + "\n"
+
+METRICS = Metrics()
+timer, timed, incr, add_bytes = METRICS.timer, METRICS.timed, METRICS.incr, METRICS.add_bytes
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body, ctype = METRICS.prometheus().encode(), "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, ctype = json.dumps(METRICS.as_dict()).encode(), "application/json"
+        else:
+            self.send_error(404); return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype); self.send_header("Content-Length", str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+_server: ThreadingHTTPServer | None = None
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Endpoint `/metrics` (Prometheus) e `/metrics.json` su un thread daemon; una volta per processo."""
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=_server.serve_forever, name="wei-metrics", daemon=True).start()
+    return _server
+
+def serve_from_env() -> ThreadingHTTPServer | None:
+    """Avvia l'endpoint se è impostato WEI_METRICS_PORT (es. 9108)."""
+    port = os.environ.get("WEI_METRICS_PORT")
+    return start_metrics_server(int(port), os.environ.get("WEI_METRICS_HOST", "127.0.0.1")) if port else None
@@ -0,0 +1,164 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import timer
+
+log = logging.getLogger(__name__)
+
+QUOTE_INTERVAL = float(os.environ.get("WEI_QUOTE_INTERVAL", 15))
+
+@dataclass(frozen=True)
+class Quote:
+    price: float
+    ts: pd.Timestamp        # ora di borsa dell'ultimo prezzo (naive)
+
+class QuoteFeed:
+    """Ultimi prezzi intraday: una sola richiesta per tutti i ticker → {ticker: Quote}."""
+
+    def last(self, tickers: list[str]) -> dict[str, Quote]:
+        raise NotImplementedError
+
+class YFinanceQuoteFeed(QuoteFeed):
+    """Barre a 1 minuto della seduta corrente in un solo `yf.download`; vale l'ultima chiusura."""
+    timeout: float = 10.0
+
+    def last(self, tickers: list[str]) -> dict[str, Quote]:
+        if not tickers: return {}
+        import yfinance as yf
+        from utils.fetch import YF_LOCK, split_frame
+        with YF_LOCK:            # stesso stato globale di yfinance dei download storici
+            df = yf.download(list(tickers), period="1d", interval="1m", auto_adjust=False, progress=False,
+                             group_by="column", threads=True, timeout=self.timeout)
+        out = {}
+        for t, s in split_frame(df, list(tickers), "Close").items():
+            ts = s.index[-1]
+            out[t] = Quote(float(s.iloc[-1]), ts.tz_localize(None) if ts.tzinfo else ts)
+        return out
+
+class FakeQuoteFeed(QuoteFeed):
+    """
+    Feed locale al posto del vendor (test, sviluppo, demo fuori orario): random walk attorno a un
+    prezzo base per ticker, preso da `base` (dict o funzione ticker -> ultimo prezzo noto).
+    """
+
+    def __init__(self, base: dict[str, float] | Callable[[str], float | None], vol: float = 0.001, seed: int = 0):
+        self.base, self.vol = base, vol
+        self._rng = np.random.default_rng(seed)
+        self._px: dict[str, float] = {}
+        self.calls = 0
+
+    def last(self, tickers: list[str]) -> dict[str, Quote]:
+        self.calls += 1; now = pd.Timestamp.now(); out = {}
+        for t in tickers:
+            px = self._px.get(t)
+            if px is None:
+                px = self.base.get(t) if isinstance(self.base, dict) else self.base(t)
+                if px is None or not np.isfinite(px): continue
+            px = self._px[t] = float(px) * float(np.exp(self._rng.normal(0.0, self.vol)))
+            out[t] = Quote(px, now)
+        return out
+
+class QuotePoller:
+    """
+    Thread daemon che ogni `interval` secondi chiede al feed gli ultimi prezzi dei ticker osservati,
+    in un solo batch. Le pagine leggono solo l'ultima fotografia (`quotes()`). Un ticker che nessuno
+    chiede con `watch()` da `idle` secondi (default 4 giri) esce dal batch; senza ticker il thread si
+    ferma e riparte al `watch()` successivo.
+    """
+
+    def __init__(self, feed: QuoteFeed, interval: float = QUOTE_INTERVAL, idle: float | None = None):
+        self.feed, self.interval = feed, interval
+        self.idle = idle if idle is not None else 4 * interval
+        self.last_error: str = ""
+        self.polled: pd.Timestamp | None = None
+        self._watched: dict[str, float] = {}      # ticker -> ultimo watch (monotonic)
+        self._quotes: dict[str, Quote] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._running = False
+
+    def watch(self, tickers: list[str]):
+        """Tiene i ticker nel batch (e riavvia il thread se era fermo); al primo giro li quota subito."""
+        now = time.monotonic()
+        with self._lock:
+            self._watched.update(dict.fromkeys(tickers, now))
+            resume, self._running = not self._running, True
+            missing = any(t not in self._quotes for t in tickers)
+        if resume:
+            if missing: self.poll()
+            self._stop.clear()
+            threading.Thread(target=self._loop, name="wei-quotes", daemon=True).start()
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def poll(self):
+        with self._lock: tickers = sorted(self._watched)
+        if not tickers: return
+        try:
+            with timer("quotes"): got = self.feed.last(tickers)
+        except Exception as e:        # un giro fallito lascia in servizio le quotazioni precedenti
+            self.last_error = f"{type(e).__name__}: {e}"
+            log.warning("poll quotazioni fallito: %s", self.last_error)
+            return
+        with self._lock:
+            self._quotes.update(got); self.polled = pd.Timestamp.now(); self.last_error = ""
+
+    def quotes(self) -> dict[str, Quote]:
+        with self._lock: return dict(self._quotes)
+
+    def _prune(self) -> bool:
+        """Toglie i ticker non più osservati; False (e thread fermo) se non ne resta nessuno."""
+        cutoff = time.monotonic() - self.idle
+        with self._lock:
+            for t in [t for t, seen in self._watched.items() if seen < cutoff]:
+                del self._watched[t]; self._quotes.pop(t, None)
+            if not self._watched: self._running = False
+            return self._running
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            if not self._prune(): return
+            self.poll()
+        with self._lock: self._running = False
+
+    def stop(self):
+        self._stop.set()
+
+_feed: QuoteFeed | None = None
+_poller: QuotePoller | None = None
+_lock = threading.Lock()
+
+def get_quote_feed() -> QuoteFeed:
+    """Feed di default: yfinance, oppure il feed finto con WEI_QUOTES=fake (base = ultime chiusure note)."""
+    global _feed
+    if _feed is None:
+        if os.environ.get("WEI_QUOTES") == "fake":
+            from utils.data import last_close
+            _feed = FakeQuoteFeed(last_close)
+        else:
+            _feed = YFinanceQuoteFeed()
+    return _feed
+
+def set_quote_feed(feed: QuoteFeed | None) -> QuoteFeed | None:
+    """Sostituisce il feed (anche del poller già avviato); restituisce il precedente."""
+    global _feed
+    prev, _feed = _feed, feed
+    if _poller is not None and feed is not None: _poller.feed = feed
+    return prev
+
+def get_quote_poller() -> QuotePoller:
+    """Poller di processo: il thread gira solo finché qualche sessione in modalità live chiama `watch()`."""
+    global _poller
+    with _lock:
+        if _poller is None: _poller = QuotePoller(get_quote_feed())
+        return _poller
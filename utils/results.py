@@ -0,0 +1,72 @@
+from __future__ import annotations
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+
+from utils.metrics import incr
+
+def nbytes(obj: Any) -> int:
+    """Stima della memoria tenuta da un risultato (DataFrame, Series, pannelli, array, tuple/dict di questi)."""
+    if obj is None: return 0
+    if isinstance(obj, pd.DataFrame): return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series): return int(obj.memory_usage(index=True, deep=False))
+    if hasattr(obj, "nbytes"): return int(obj.nbytes)
+    if isinstance(obj, (tuple, list)): return sum(nbytes(o) for o in obj)
+    if isinstance(obj, dict): return sum(nbytes(v) for v in obj.values())
+    return sys.getsizeof(obj)
+
+class ResultCache:
+    """
+    Cache di processo dei risultati calcolati (tabelle, pannelli, serie rebased), condivisa tra
+    sessioni senza copie né pickle. Ogni chiave tiene una sola versione dei dati: una versione nuova
+    (barra nuova nello store) la ricalcola e sostituisce. LRU con limite in byte (`max_bytes`).
+    Chi legge non deve modificare i risultati in place (per i DataFrame: `copy(deep=False)`).
+    """
+
+    def __init__(self, max_bytes: int, name: str = "results"):
+        self.max_bytes, self.name = max_bytes, name
+        self._entries: OrderedDict[Hashable, tuple[str, Any, int]] = OrderedDict()
+        self._building: dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def get(self, key: Hashable, version: str, build: Callable[[], Any]) -> Any:
+        hit = self._lookup(key, version)
+        if hit is not None: return hit[0]
+        with self._lock: klock = self._building.setdefault(key, threading.Lock())
+        try:
+            with klock:                         # un solo calcolo per chiave anche con più sessioni
+                hit = self._lookup(key, version, count=False)
+                if hit is not None: return hit[0]
+                incr(f"{self.name}.miss")
+                value = build()
+                self._put(key, version, value)
+        finally:                                # anche se build() solleva: niente lock orfani
+            with self._lock: self._building.pop(key, None)
+        return value
+
+    def _lookup(self, key: Hashable, version: str, count: bool = True) -> tuple[Any] | None:
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None or e[0] != version: return None
+            self._entries.move_to_end(key)
+        if count: incr(f"{self.name}.hit")
+        return (e[1],)
+
+    def _put(self, key: Hashable, version: str, value: Any):
+        size = nbytes(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self.size -= old[2]
+            self._entries[key] = (version, value, size); self.size += size
+            while self.size > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, s) = self._entries.popitem(last=False); self.size -= s
+
+    def clear(self):
+        with self._lock: self._entries.clear(); self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
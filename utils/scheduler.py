@@ -0,0 +1,113 @@
+from __future__ import annotations
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+import pandas as pd
+
+T = TypeVar("T")
+
+class TokenBucket:
+    """Rate limit: `rate` richieste/secondo con raffiche fino a `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate, self.burst = float(rate), float(burst)
+        self._tokens, self._t = float(burst), time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._t) * self.rate)
+                self._t = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+@dataclass
+class FetchStats:
+    calls: int = 0
+    failures: int = 0
+    retries: int = 0
+    last_latency: float = 0.0
+    total_latency: float = 0.0
+    last_error: str = ""
+
+class FetchScheduler:
+    """
+    Esegue le richieste di rete su un pool limitato di thread, con timeout per tentativo,
+    retry con backoff esponenziale e rate limit a token bucket.
+    Tiene latenza e fallimenti per ticker.
+    """
+
+    def __init__(self, max_workers: int = 4, timeout: float = 30.0, retries: int = 2,
+                 backoff: float = 0.5, rate: float = 4.0, burst: int = 4):
+        self.max_workers, self.timeout, self.retries, self.backoff = max_workers, timeout, retries, backoff
+        self.bucket = TokenBucket(rate, burst)
+        self._jobs = ThreadPoolExecutor(max_workers, thread_name_prefix="wei-fetch")
+        # I tentativi girano in un pool separato: un timeout libera il job senza bloccare i retry
+        self._io = ThreadPoolExecutor(max_workers * 2, thread_name_prefix="wei-io")
+        self._stats: dict[str, FetchStats] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, keys: list[str], latency: float, retries: int, error: str | None):
+        with self._lock:
+            for k in keys:
+                rec = self._stats.setdefault(k, FetchStats())
+                rec.calls += 1; rec.retries += retries
+                rec.last_latency = latency; rec.total_latency += latency
+                if error is not None: rec.failures += 1; rec.last_error = error
+
+    def run(self, fn: Callable[[], T], keys: list[str]) -> T:
+        """Esegue `fn` con retry; solleva l'ultima eccezione se tutti i tentativi falliscono."""
+        t0 = time.perf_counter(); err = None
+        for attempt in range(self.retries + 1):
+            if attempt: time.sleep(self.backoff * 2 ** (attempt - 1))
+            self.bucket.acquire()
+            try:
+                res = self._io.submit(fn).result(timeout=self.timeout)
+                self._record(keys, time.perf_counter() - t0, attempt, None)
+                return res
+            except FutureTimeout:
+                err = TimeoutError(f"timeout dopo {self.timeout:.0f}s")
+            except Exception as e:
+                err = e
+        self._record(keys, time.perf_counter() - t0, self.retries, f"{type(err).__name__}: {err}")
+        raise err
+
+    def map(self, calls: list[tuple[list[str], Callable[[], T]]], limit: int | None = None) -> list[T | None]:
+        """
+        Lancia in parallelo, al più `limit` job alla volta (default: tutto il pool); un job fallito
+        restituisce None senza fermare gli altri.
+        """
+        gate = threading.BoundedSemaphore(limit) if limit and limit < self.max_workers else None
+        def _safe(fn, keys):
+            try:
+                if gate is None: return self.run(fn, keys)
+                with gate: return self.run(fn, keys)
+            except Exception: return None
+        futs = [self._jobs.submit(_safe, fn, keys) for keys, fn in calls]
+        return [f.result() for f in futs]
+
+    def report(self) -> pd.DataFrame:
+        with self._lock:
+            rows = [{"Ticker": k, "Chiamate": v.calls, "Errori": v.failures, "Retry": v.retries,
+                     "Ultima (s)": round(v.last_latency, 3),
+                     "Media (s)": round(v.total_latency / v.calls, 3) if v.calls else None,
+                     "Ultimo errore": v.last_error} for k, v in self._stats.items()]
+        return pd.DataFrame(rows).set_index("Ticker") if rows else pd.DataFrame()
+
+_scheduler = FetchScheduler()
+
+def get_scheduler() -> FetchScheduler:
+    return _scheduler
+
+def set_scheduler(scheduler: FetchScheduler) -> FetchScheduler:
+    global _scheduler
+    prev, _scheduler = _scheduler, scheduler
+    return prev
@@ -0,0 +1,28 @@
+from __future__ import annotations
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:                       # solo annotazioni: la home non deve caricare pandas
+    import pandas as pd
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Risultati precalcolati per tutte le valute, pubblicati in blocco dal thread di warm-up."""
+    version: str
+    built: pd.Timestamp
+    tables: dict[str, pd.DataFrame] = field(default_factory=dict)
+    panels: dict = field(default_factory=dict)   # valuta -> FilledPanel (anche fonte delle serie rebased)
+
+_current: Snapshot | None = None
+_lock = threading.Lock()
+
+def current_snapshot() -> Snapshot | None:
+    return _current
+
+def publish_snapshot(snap: Snapshot | None) -> Snapshot | None:
+    """Sostituzione atomica: chi legge vede o il vecchio snapshot o il nuovo, mai un mix."""
+    global _current
+    with _lock:
+        prev, _current = _current, snap
+    return prev
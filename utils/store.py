@@ -0,0 +1,91 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+BARS_DTYPE = np.dtype([("date", np.int64), ("px", np.float64)])
+STORE_DIR = Path(os.environ.get("WEI_DATA_DIR", Path(__file__).resolve().parent.parent / ".wei_store"))
+
+class PriceStore:
+    """
+    Storico prezzi su disco, un ticker = un array NumPy strutturato (date int64 ns + prezzi float64,
+    in un solo file) + un json con la copertura (`start`) e l'ultimo controllo (`checked`).
+    Le letture sono memory-mapped; le scritture sono atomiche (file temporaneo + rename): date e
+    prezzi si pubblicano insieme, un lettore concorrente vede la versione vecchia o la nuova.
+    """
+
+    def __init__(self, root: str | Path = STORE_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def _path(self, key: str, ext: str) -> Path:
+        return self.root / f"{quote(key, safe='')}.{ext}"
+
+    def meta(self, key: str) -> dict | None:
+        try: return json.loads(self._path(key, "json").read_text())
+        except (OSError, ValueError): return None
+
+    def load(self, key: str) -> pd.Series | None:
+        try:
+            bars = np.load(self._path(key, "bars.npy"), mmap_mode="r")
+            return pd.Series(np.asarray(bars["px"]), dtype=float,
+                             index=pd.DatetimeIndex(np.asarray(bars["date"]).astype("datetime64[ns]")))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def last_date(self, key: str) -> pd.Timestamp | None:
+        s = self.load(key)
+        return None if s is None or s.empty else s.index[-1]
+
+    def write(self, key: str, s: pd.Series, start: pd.Timestamp, checked: pd.Timestamp | None = None):
+        s = s[~s.index.duplicated(keep="last")].sort_index()
+        meta = {"start": str(pd.Timestamp(start).date()), "rows": int(len(s)),
+                "checked": (checked or pd.Timestamp.now()).isoformat()}
+        try:
+            with self._lock:
+                self.root.mkdir(parents=True, exist_ok=True)
+                bars = np.empty(len(s), dtype=BARS_DTYPE)
+                bars["date"] = s.index.values.astype("datetime64[ns]").astype(np.int64)
+                bars["px"] = s.to_numpy(dtype=np.float64)
+                self._save(self._path(key, "bars.npy"), bars)
+                self._save(self._path(key, "json"), json.dumps(meta))
+        except OSError:
+            pass  # disco non scrivibile: si lavora solo in memoria
+
+    def append(self, key: str, new: pd.Series, checked: pd.Timestamp | None = None):
+        old, meta = self.load(key), self.meta(key) or {}
+        # le barre in comune si sovrascrivono: l'ultima salvata può essere di una seduta ancora aperta
+        if old is None or old.empty: s = new
+        else: s = old if new.empty else pd.concat([old[old.index < new.index[0]], new])
+        self.write(key, s, pd.Timestamp(meta.get("start", s.index.min() if len(s) else pd.Timestamp.now())), checked)
+
+    def touch(self, key: str):
+        """Aggiorna solo `checked` (nessuna barra nuova o ticker senza dati): la copertura `start` non cambia."""
+        s = self.load(key)
+        meta = self.meta(key) or {}
+        self.write(key, s if s is not None else pd.Series(dtype=float),
+                   pd.Timestamp(meta.get("start", pd.Timestamp.now())))
+
+    @staticmethod
+    def _save(path: Path, payload):
+        tmp = path.with_name(path.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        if isinstance(payload, str): tmp.write_text(payload)
+        else:
+            with open(tmp, "wb") as fh: np.save(fh, payload)
+        os.replace(tmp, path)
+
+_store: PriceStore | None = PriceStore()
+
+def get_store() -> PriceStore | None:
+    return _store
+
+def set_store(store: PriceStore | None) -> PriceStore | None:
+    """None disattiva la persistenza su disco."""
+    global _store
+    prev, _store = _store, store
+    return prev
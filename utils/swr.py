@@ -0,0 +1,145 @@
+from __future__ import annotations
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+import pandas as pd
+
+from utils.metrics import incr
+
+Loader = Callable[[list[str], pd.Timestamp], dict[str, pd.Series]]
+Peek = Callable[[str, pd.Timestamp], tuple[pd.Series, pd.Timestamp] | None]
+
+class FetchFailed(Exception):
+    """Il loader non è riuscito a scaricare `failed`; `got` sono le serie degli altri ticker."""
+
+    def __init__(self, got: dict[str, pd.Series], failed: set[str]):
+        super().__init__(f"download fallito: {', '.join(sorted(failed))}")
+        self.got, self.failed = got, set(failed)
+
+@dataclass
+class Entry:
+    series: pd.Series
+    start: pd.Timestamp        # copertura richiesta (la serie può iniziare dopo)
+    fetched: pd.Timestamp      # ultimo download riuscito
+    checked: pd.Timestamp      # ultimo tentativo (riuscito o no)
+    error: str = ""
+
+class SWRCache:
+    """
+    Cache di serie per ticker in modalità stale-while-revalidate: una serie scaduta viene servita
+    subito e riscaricata in background; un refresh fallito lascia in servizio l'ultima serie buona.
+    Si blocca sulla rete solo per ticker mai visti (o se `swr=False`).
+    `peek` legge l'ultima copia disponibile senza rete (es. store su disco) per i riavvii a freddo.
+    Con `name` conta hit / stale / miss per chiave nelle metriche (`<name>.hit` ecc.).
+    """
+
+    def __init__(self, loader: Loader, ttl: pd.Timedelta, swr: bool = True, peek: Peek | None = None,
+                 name: str = ""):
+        self.loader, self.ttl, self.swr, self.peek, self.name = loader, ttl, swr, peek, name
+        self._entries: dict[str, Entry] = {}
+        self._inflight: set[str] = set()
+        self._lock = threading.Lock()
+        self._bg = ThreadPoolExecutor(1, thread_name_prefix="wei-swr")
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+    def get(self, keys: list[str], start: pd.Timestamp, block: bool = False) -> dict[str, pd.Series]:
+        """`block=True` riscarica in linea le serie scadute (thread di warm-up)."""
+        self.ensure(keys, start, block)
+        return self.peek_many(keys, start)
+
+    def ensure(self, keys: list[str], start: pd.Timestamp, block: bool = False):
+        """Come `get` ma senza restituire le serie: solo caricamenti e revalidate."""
+        now = pd.Timestamp.now(); cold, stale = [], []
+        with self._lock:
+            for k in keys:
+                e = self._entries.get(k)
+                if (e is None or e.start > start) and self.swr and self.peek is not None:
+                    seen = self.peek(k, start)
+                    if seen is not None:
+                        e = self._entries[k] = Entry(seen[0], start, seen[1], seen[1])
+                if e is None or e.start > start: cold.append(k)
+                elif now - e.checked > self.ttl: stale.append(k)
+            # il refresh mantiene la copertura più lunga già in cache
+            stale_start = min([self._entries[k].start for k in stale], default=start)
+        if self.name:
+            incr(f"{self.name}.hit", len(keys) - len(cold) - len(stale))
+            incr(f"{self.name}.stale", len(stale)); incr(f"{self.name}.miss", len(cold))
+        if cold: self._load(cold, start)
+        if stale:
+            if block or not self.swr: self._load(stale, stale_start)
+            else: self._revalidate(stale, stale_start)
+
+    def peek_many(self, keys: list[str], start: pd.Timestamp) -> dict[str, pd.Series]:
+        with self._lock:
+            out = {}
+            for k in keys:
+                e = self._entries.get(k)
+                if e is None or e.series.empty: continue
+                s = e.series[e.series.index >= start]
+                if not s.empty: out[k] = s
+            return out
+
+    def _load(self, keys: list[str], start: pd.Timestamp):
+        failed: set[str] = set(); err = ""
+        try:
+            got = self.loader(keys, start)
+        except FetchFailed as e:
+            got, failed, err = e.got, e.failed, str(e)
+        except Exception as e:
+            got, failed, err = {}, set(keys), f"{type(e).__name__}: {e}"
+        now = pd.Timestamp.now()
+        with self._lock:
+            for k in keys:
+                s, e = got.get(k), self._entries.get(k)
+                why = err if k in failed else "nessun dato"
+                if k in failed and (e is None or e.series.empty) and self.peek is not None:
+                    seen = self.peek(k, start)       # refresh fallito: l'ultima copia su disco, con la sua età
+                    if seen is not None: e = self._entries[k] = Entry(seen[0], start, seen[1], now)
+                if s is not None and not s.empty:
+                    self._entries[k] = Entry(s, start, now, now)
+                elif e is not None and not e.series.empty:
+                    e.checked, e.error = now, why      # tiene l'ultima serie buona
+                else:
+                    self._entries[k] = Entry(pd.Series(dtype=float), start, now, now, why)
+
+    def _revalidate(self, keys: list[str], start: pd.Timestamp):
+        with self._lock:
+            keys = [k for k in keys if k not in self._inflight]
+            self._inflight.update(keys)
+        if not keys: return
+        def _run():
+            try: self._load(keys, start)
+            finally:
+                with self._lock: self._inflight.difference_update(keys)
+        self._bg.submit(_run)
+
+    def version(self, keys: list[str]) -> tuple:
+        """Ultima barra per chiave: cambia solo quando arriva un dato nuovo."""
+        with self._lock:
+            out = []
+            for k in keys:
+                e = self._entries.get(k)
+                s = e.series if e is not None else None
+                out.append((k, len(s), s.index[-1], float(s.iloc[-1])) if s is not None and len(s) else (k,))
+            return tuple(out)
+
+    def status(self, keys: list[str]) -> pd.DataFrame:
+        """As-of (ultima barra), età dell'ultimo download riuscito e stato per chiave."""
+        now = pd.Timestamp.now(); rows = []
+        with self._lock:
+            for k in keys:
+                e = self._entries.get(k)
+                if e is None: rows.append({"key": k, "As of": None, "Età": None, "Stato": "—"}); continue
+                asof = e.series.index[-1] if len(e.series) else None
+                if e.series.empty: stato = "nessun dato"
+                elif k in self._inflight: stato = "in aggiornamento"
+                elif e.error: stato = "stale (refresh fallito)"
+                elif now - e.fetched > self.ttl: stato = "stale"
+                else: stato = "ok"
+                rows.append({"key": k, "As of": asof, "Età": now - e.fetched, "Stato": stato})
+        if not rows: return pd.DataFrame(columns=["key", "As of", "Età", "Stato"]).set_index("key")
+        return pd.DataFrame(rows).set_index("key")
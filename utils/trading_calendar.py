@@ -0,0 +1,80 @@
+from __future__ import annotations
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import BDay
+
+_clock: Callable[[], pd.Timestamp] = lambda: pd.Timestamp.today()
+
+def today() -> pd.Timestamp:
+    """Data corrente (mezzanotte): cambia da sola al cambio di giorno, anche a server avviato."""
+    return _clock().normalize()
+
+def set_clock(clock: Callable[[], pd.Timestamp] | None) -> Callable[[], pd.Timestamp]:
+    """Sostituisce l'orologio (es. data fissa nei benchmark); None ripristina quello di sistema."""
+    global _clock
+    prev, _clock = _clock, clock or (lambda: pd.Timestamp.today())
+    return prev
+
+def _starts(day: pd.Timestamp) -> dict[str, pd.Timestamp | None]:
+    return {"1D": None,
+            "1W": day - pd.DateOffset(weeks=1),
+            "MTD": pd.Timestamp(day.year, day.month, 1),
+            "YTD": pd.Timestamp(day.year, 1, 1),
+            "1Y": day - pd.DateOffset(years=1),
+            "3Y": day - pd.DateOffset(years=3),
+            "5Y": day - pd.DateOffset(years=5)}
+
+_anchors: tuple[pd.Timestamp, dict[str, pd.Timestamp | None], tuple[pd.Timestamp, pd.Timestamp]] | None = None
+
+def _today_anchors():
+    """(giorno, inizi orizzonti, finestra YTD): ricalcolati solo al cambio di data."""
+    global _anchors
+    day = today(); a = _anchors
+    if a is None or a[0] != day:
+        a = _anchors = (day, _starts(day), ((pd.Timestamp(day.year, 1, 1) - BDay(1)).normalize(), day))
+    return a
+
+def horizon_start(h: str) -> pd.Timestamp | None:
+    """Data d'inizio dell'orizzonte `h` (None per 1D); orizzonti ignoti valgono 1Y. Calcolate una volta al giorno."""
+    starts = _today_anchors()[1]
+    return starts.get(h, starts["1Y"])
+
+def horizon_starts() -> dict[str, pd.Timestamp | None]:
+    return dict(_today_anchors()[1])
+
+def ytd_window() -> tuple[pd.Timestamp, pd.Timestamp]:
+    """Finestra Custom di default: ultimo giorno lavorativo dell'anno scorso -> oggi."""
+    return _today_anchors()[2]
+
+class TradingCalendar:
+    """
+    Date di quotazione ordinate di una borsa (o di uno strumento: le sue barre sono il suo calendario).
+    Le righe d'ancora degli orizzonti si trovano per ricerca binaria e restano in cache per il giorno.
+    """
+
+    def __init__(self, dates):
+        d = np.asarray(dates, dtype="datetime64[ns]")
+        self.dates = d if len(d) < 2 or (d[1:] >= d[:-1]).all() else np.sort(d)
+        self.dates.flags.writeable = False
+        self._rows: tuple[pd.Timestamp, dict[str, int]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def row_before(self, dt) -> np.ndarray:
+        """Indice dell'ultima data < dt (-1 se nessuna); dt scalare o array."""
+        return np.searchsorted(self.dates, np.asarray(dt, dtype="datetime64[ns]"), side="left") - 1
+
+    def row_on_or_before(self, dt) -> np.ndarray:
+        return np.searchsorted(self.dates, np.asarray(dt, dtype="datetime64[ns]"), side="right") - 1
+
+    def anchor_rows(self) -> dict[str, int]:
+        """Per orizzonte con data d'inizio: ultima riga prima dell'inizio (la prima dentro è +1)."""
+        day = today(); r = self._rows
+        if r is None or r[0] != day:
+            starts = {h: s for h, s in horizon_starts().items() if s is not None}
+            rows = self.row_before(np.array(list(starts.values()), dtype="datetime64[ns]"))
+            r = self._rows = (day, dict(zip(starts, rows.tolist())))
+        return r[1]
@@ -1,7 +1,12 @@
 from __future__ import annotations
+from html import escape
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from utils.metrics import timed
+
 HORIZONS = ["1D", "1W", "MTD", "YTD", "1Y", "3Y", "5Y"]
 HARD = ["USD", "EUR", "GBP", "JPY", "CHF"]
 CCY_OPTIONS = ["LOCAL"] + HARD
@@ -25,40 +30,109 @@ def mobile_css():
     </style>
     """, unsafe_allow_html=True)
 
-def style_perf_df(df: pd.DataFrame, num_cols: list[str]) -> "pd.io.formats.style.Styler":
-    """Styler con percentuali, heatmap e separatore tra regioni (desktop)."""
-    fmt = {c: "{:+.2f}%" for c in num_cols}
-    sty = (df.style
-           .format(fmt)
-           .background_gradient(subset=num_cols, cmap="RdYlGn", vmin=-10, vmax=10)
-           .set_properties(subset=["Region","Local CCY"], **{"text-align":"left", "font-weight":"600"})
-           .set_properties(subset=num_cols, **{"text-align":"right"}))
-
-    def _apply_separators(data: pd.DataFrame):
-        styles = pd.DataFrame("", index=data.index, columns=data.columns)
-        prev = None
-        for i, (idx, row) in enumerate(data.iterrows()):
-            cur = row.get("Region", None)
-            if i == 0 or cur != prev:
-                styles.loc[idx, :] = "border-top: 3px solid #9aa0a6;"
-            prev = cur
-        return styles
-
-    return sty.apply(_apply_separators, axis=None)
-
-def render_perf_table(df: pd.DataFrame, num_cols: list[str], mobile: bool):
+def fmt_age(td: pd.Timedelta | None) -> str:
+    """Età leggibile di un dato: '12 min', '3 h', '2 g'."""
+    if td is None or pd.isna(td): return ""
+    m = int(td.total_seconds() // 60)
+    return f"{m} min" if m < 90 else (f"{m // 60} h" if m < 48 * 60 else f"{m // 1440} g")
+
+def freshness_cols(fresh: pd.DataFrame) -> pd.DataFrame:
+    """Colonne 'As of' (ultima barra) e 'Stato' (con età se il dato servito è vecchio)."""
+    asof = pd.to_datetime(fresh["As of"]).dt.strftime("%Y-%m-%d").fillna("")
+    stato = [s if s in ("ok", "nessun dato", "—") else f"{s} · {fmt_age(a)}"
+             for s, a in zip(fresh["Stato"], fresh["Età"])]
+    return pd.DataFrame({"As of": asof, "Stato": stato}, index=fresh.index)
+
+# RdYlGn (ColorBrewer, 11 classi) interpolato in N_BUCKETS colori: stesso aspetto del
+# background_gradient del Styler, senza matplotlib e senza calcoli per cella
+_RDYLGN = ["#a50026", "#d73027", "#f46d43", "#fdae61", "#fee08b", "#ffffbf",
+           "#d9ef8b", "#a6d96a", "#66bd63", "#1a9850", "#006837"]
+N_BUCKETS = 41
+
+def _palette(n: int = N_BUCKETS) -> tuple[list[str], list[str]]:
+    anchors = np.array([[int(h[i:i+2], 16) for i in (1, 3, 5)] for h in _RDYLGN], dtype=float)
+    pos = np.linspace(0, len(anchors) - 1, n)
+    rgb = np.column_stack([np.interp(pos, np.arange(len(anchors)), anchors[:, j]) for j in range(3)])
+    lin = np.where(rgb / 255 <= 0.03928, rgb / 255 / 12.92, ((rgb / 255 + 0.055) / 1.055) ** 2.4)
+    lum = lin @ np.array([0.2126, 0.7152, 0.0722])
+    bg = ["#%02x%02x%02x" % tuple(c) for c in np.rint(rgb).astype(int)]
+    fg = ["#f1f1f1" if l < 0.408 else "#000000" for l in lum]
+    return bg, fg
+
+_BG, _FG = _palette()
+
+def color_buckets(values: np.ndarray, vmin: float = -10, vmax: float = 10) -> np.ndarray:
+    """Indice di colore per ogni valore (clip a [vmin, vmax], vmin > vmax inverte la scala); -1 per NaN."""
+    v = np.asarray(values, dtype=float)
+    b = np.rint((np.clip(v, min(vmin, vmax), max(vmin, vmax)) - vmin) / (vmax - vmin) * (N_BUCKETS - 1))
+    return np.where(np.isnan(v), -1, b).astype(int)
+
+_PERF_CSS = """
+<style>
+.wei-perf{overflow-x:auto;}
+.wei-perf table{border-collapse:collapse;font-size:0.92rem;width:100%;}
+.wei-perf th,.wei-perf td{padding:4px 8px;border-bottom:1px solid #e6e6e6;white-space:nowrap;}
+.wei-perf thead th{position:sticky;top:0;background:#fafafa;text-align:right;}
+.wei-perf thead th.l,.wei-perf td.l{text-align:left;}
+.wei-perf td.b{font-weight:600;}
+.wei-perf td.n{text-align:right;}
+.wei-perf tr.sep td,.wei-perf tr.sep th{border-top:3px solid #9aa0a6;}
+</style>
+"""
+
+# Vista della tabella Performance: metrica -> (prefisso colonne, scala colori vmin/vmax, formato)
+METRIC_VIEWS = {
+    "Rendimenti":   ("", (-10, 10), "%+.2f%%"),
+    "Volatilità":   ("Vol", (40, 0), "%.2f%%"),          # alta volatilità in rosso
+    "Max drawdown": ("MaxDD", (-40, 0), "%.2f%%"),
+    "Sharpe":       ("Sharpe", (-2, 2), "%+.2f"),
+}
+
+@st.cache_data(show_spinner=False, max_entries=256)
+@timed("styling")
+def perf_table_html(df: pd.DataFrame, num_cols: tuple[str, ...], view_key: tuple = (),
+                    vrange: tuple[float, float] = (-10, 10), fmt: str = "%+.2f%%") -> str:
+    """
+    Tabella HTML con heatmap e separatori tra regioni. Colori e separatori sono calcolati in
+    blocco (bucket NumPy, confini di gruppo); il risultato è in cache per contenuto tabella + vista.
+    """
+    num = [c for c in num_cols if c in df.columns]
+    text = [c for c in df.columns if c not in num]
+    vals = df[num].to_numpy(dtype=float, na_value=np.nan)
+    buckets = color_buckets(vals, *vrange)
+    shown = np.where(np.isnan(vals), "", np.char.mod(fmt, np.nan_to_num(vals)))
+    region = df["Region"].to_numpy() if "Region" in df.columns else np.zeros(len(df))
+    sep = np.r_[True, region[1:] != region[:-1]] if len(df) else np.array([], bool)
+
+    head = "".join(f'<th class="l">{escape(str(c))}</th>' for c in [df.index.name or ""] + text)
+    head += "".join(f"<th>{escape(str(c))}</th>" for c in num)
+    bold = {"Region", "Local CCY"}
+    rows = []
+    for i, ix in enumerate(df.index):
+        cells = [f'<th class="l">{escape(str(ix))}</th>']
+        cells += [f'<td class="l{" b" if c in bold else ""}">{escape(str(v))}</td>'
+                  for c, v in zip(text, df[text].iloc[i].tolist())] if text else []
+        cells += [f'<td class="n">{shown[i, j]}</td>' if buckets[i, j] < 0 else
+                  f'<td class="n" style="background:{_BG[buckets[i, j]]};color:{_FG[buckets[i, j]]}">{shown[i, j]}</td>'
+                  for j in range(len(num))]
+        rows.append(f'<tr{" class=sep" if sep[i] else ""}>{"".join(cells)}</tr>')
+    return (f'{_PERF_CSS}<div class="wei-perf"><table><thead><tr>{head}</tr></thead>'
+            f'<tbody>{"".join(rows)}</tbody></table></div>')
+
+def render_perf_table(df: pd.DataFrame, num_cols: list[str], mobile: bool,
+                      vrange: tuple[float, float] = (-10, 10), fmt: str = "%+.2f%%"):
     """
-    Desktop: Styler (colori + separatori).
+    Desktop: tabella HTML precalcolata (colori + separatori), in cache.
     Mobile:  DataFrame scrollabile e più leggibile.
     """
     if not mobile:
-        st.write(style_perf_df(df, num_cols))
+        st.markdown(perf_table_html(df, tuple(num_cols), (), vrange, fmt), unsafe_allow_html=True)
         return
 
     # Mobile: converti le colonne % in stringhe formattate, usa st.dataframe
     df_show = df.copy()
     for c in num_cols:
         if c in df_show.columns:
-            df_show[c] = df_show[c].map(lambda x: f"{x:+.2f}%" if pd.notna(x) else "")
+            df_show[c] = df_show[c].map(lambda x: fmt % x if pd.notna(x) else "")
     st.dataframe(df_show, use_container_width=True, hide_index=False)
 
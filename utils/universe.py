@@ -0,0 +1,53 @@
+from __future__ import annotations
+import csv
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+UNIVERSE_FILE = Path(os.environ.get("WEI_UNIVERSE", Path(__file__).resolve().parent.parent / "universe.csv"))
+
+@dataclass(frozen=True)
+class Instrument:
+    name: str
+    ticker: str
+    ccy: str
+    region: str = "Other"
+    tags: tuple[str, ...] = ()
+
+def _row(r: dict) -> Instrument:
+    tags = r.get("tags") or ()
+    if isinstance(tags, str): tags = [t for t in tags.replace(",", ";").split(";")]
+    return Instrument(str(r["name"]).strip(), str(r["ticker"]).strip(), str(r["currency"]).strip().upper(),
+                      str(r.get("region") or "Other").strip(), tuple(t.strip() for t in tags if t.strip()))
+
+def read_universe(path: str | Path = UNIVERSE_FILE) -> dict[str, Instrument]:
+    """
+    Universo strumenti da file: CSV con colonne `name,ticker,currency,region,tags` (tag separati da `;`)
+    oppure YAML (lista di mappe con le stesse chiavi, richiede PyYAML). L'ordine del file è preservato.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".yaml", ".yml"):
+        import yaml
+        rows = yaml.safe_load(path.read_text(encoding="utf-8")) or []
+        if isinstance(rows, dict): rows = rows.get("instruments", [])
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = [r for r in csv.DictReader(f) if (r.get("name") or "").strip() and not r["name"].startswith("#")]
+    out: dict[str, Instrument] = {}
+    for r in rows:
+        inst = _row(r)
+        if inst.name in out: raise ValueError(f"{path}: strumento duplicato '{inst.name}'")
+        out[inst.name] = inst
+    return out
+
+def select(universe: dict[str, Instrument], region: str | None = None, tags: list[str] | None = None) -> list[str]:
+    """Nomi che passano i filtri (regione esatta; tutti i tag richiesti), nell'ordine del file."""
+    want = set(tags or ())
+    return [n for n, i in universe.items()
+            if (not region or region == "Tutte" or i.region == region) and want <= set(i.tags)]
+
+def regions(universe: dict[str, Instrument]) -> list[str]:
+    return list(dict.fromkeys(i.region for i in universe.values()))
+
+def all_tags(universe: dict[str, Instrument]) -> list[str]:
+    return sorted({t for i in universe.values() for t in i.tags})
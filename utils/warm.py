@@ -0,0 +1,91 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+
+from utils.snapshot import Snapshot, current_snapshot, publish_snapshot
+
+log = logging.getLogger(__name__)
+
+WARM_INTERVAL = float(os.environ.get("WEI_WARM_INTERVAL", 15 * 60))
+
+class Warmer:
+    """
+    Thread daemon: ogni `interval` secondi aggiorna prezzi/FX (top-up dello store su disco),
+    ricalcola tabelle e pannelli prezzi per tutte le valute e pubblica il nuovo snapshot.
+    Le richieste degli utenti leggono solo lo snapshot pubblicato: niente rete in pagina.
+    """
+
+    def __init__(self, interval: float = WARM_INTERVAL):
+        self.interval = interval
+        self.last_error: str = ""
+        self.last_duration: float = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def refresh_once(self) -> Snapshot | None:
+        t0 = time.perf_counter()
+        try:
+            from utils.data import build_snapshot   # import pesante: nel thread di warm-up, non nella pagina
+            snap = build_snapshot()
+        except Exception as e:  # un giro fallito non deve togliere lo snapshot buono
+            self.last_error = f"{type(e).__name__}: {e}"
+            log.exception("warm-up fallito")
+            return None
+        self.last_duration, self.last_error = time.perf_counter() - t0, ""
+        publish_snapshot(snap)
+        return snap
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.refresh_once()
+            self._stop.wait(self.interval)
+
+    def start(self) -> "Warmer":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="wei-warm", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+_warmer: Warmer | None = None
+_lock = threading.Lock()
+
+def start_background(interval: float = WARM_INTERVAL) -> Warmer | None:
+    """
+    Avvia (una sola volta per processo) il warm-up in background; WEI_WARM=0 lo disattiva.
+    Con WEI_SNAPSHOT_DIR si parte subito dall'ultimo export su disco.
+    """
+    global _warmer
+    if os.environ.get("WEI_METRICS_PORT"):
+        from utils.metrics import serve_from_env
+        serve_from_env()
+    if os.environ.get("WEI_SNAPSHOT_DIR") and current_snapshot() is None:
+        from utils.export import load_from_env
+        load_from_env()
+    if os.environ.get("WEI_WARM", "1") == "0": return None
+    with _lock:
+        if _warmer is None: _warmer = Warmer(interval)
+        return _warmer.start()
+
+def get_warmer() -> Warmer | None:
+    return _warmer
+
+def main(argv: list[str] | None = None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Aggiorna periodicamente lo store prezzi e precalcola le viste.")
+    ap.add_argument("--interval", type=float, default=WARM_INTERVAL, help="secondi tra due refresh")
+    ap.add_argument("--once", action="store_true", help="un solo refresh e uscita")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    w = Warmer(args.interval)
+    while True:
+        snap = w.refresh_once()
+        if snap is not None:
+            log.info("snapshot %s pronto in %.1fs", snap.version, w.last_duration)
+        if args.once: return 0 if snap is not None else 1
+        time.sleep(args.interval)
@@ -0,0 +1,11 @@
+"""Warm-up da riga di comando: `python warm_cache.py [--once] [--interval 900]`.
+
+Tiene aggiornato lo store prezzi su disco (`.wei_store/`) indipendentemente dal server Streamlit,
+così il primo visitatore dopo un riavvio non aspetta i download.
+"""
+import sys
+
+from utils.warm import main
+
+if __name__ == "__main__":
+    sys.exit(main())